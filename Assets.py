@@ -0,0 +1,108 @@
+'''Compiled asset bundle. Starting a game needs the card files (resources, specials, assignments and land tiles), the
+board file and the neighbour table of the hex grid. Instead of parsing and building these at every start, they are
+compiled once into a single pickle file. The bundle is keyed by a hash of the contents of the source files and the
+config options which are used to compile it, so it is rebuilt automatically as soon as any of them changes.
+
+Binary board files (see Board.py) are not put in the bundle, they are memory-mapped at every start instead.
+
+The bundle is stored in the directory set by the cache_dir option of the [Assets] section of the game config, asset_cache
+by default. Deleting the directory is always safe.
+'''
+import hashlib
+import os
+import pickle
+
+import Board
+import Cards
+from Cards import card_types
+from Hexgrid import Hexgrid
+import Log
+
+log = Log.get_logger('assets')
+
+
+class AssetBundle:
+    '''The compiled assets of a game config. On creation the bundle is loaded from the cache directory if its key matches
+    the current sources, otherwise it is compiled from the sources and saved for the next start. Either way the card
+    files are registered in card_types, so the game and the grid find them without parsing. The board and the neighbour
+    table are passed to Grid and Grid.load_map by the caller.'''
+    version = 2     # Increase when the contents of the bundle change, so old bundles are never used
+    code_files = [Board.__file__, Cards.__file__]   # Modules of the classes in the bundle, part of the key
+
+    def __init__(self, config):
+        self.config = config
+        self.cache_dir = config.get('Assets', 'cache_dir', fallback='asset_cache')
+        self.file_name = os.path.join(self.cache_dir, 'assets.pickle')
+        self.card_files = [config.get('Game', 'resources'), config.get('Game', 'specials'),
+                           config.get('Game', 'assignments'), config.get('Grid', 'tile_file')]
+        self.board_file = config.get('Game', 'board')
+        self.csv_board = self.board_file.lower().endswith('.csv')  # Binary boards are memory-mapped, not bundled
+        self.key = self.get_key()
+
+        assets = self.load()
+        if assets is None:
+            assets = self.compile()
+            self.save(assets)
+        self.cards = assets['cards']            # Card file name -> sections, see CardTypes.read_file
+        self.board = assets['board']            # Tiles and start objects of each hex, see Board.Board
+        if not self.csv_board:
+            self.board = Board.read(self.board_file)
+        self.neighbours = assets['neighbours']  # Neighbour table of the grid, see Hexgrid
+        for file_name in self.card_files:
+            card_types.add_file(file_name, self.cards[file_name])
+
+    def compile(self):
+        ''' Parses the sources and builds the assets. Returns a dict with the sections of the card files, the board and
+        the neighbour table.'''
+        log.info('Compiling assets to %s', self.file_name)
+        grid = Hexgrid(self.config.getint('Grid', 'hexes_x'), self.config.getint('Grid', 'hexes_y'), 0)
+        return {'cards': dict((file_name, card_types.read_file(file_name)) for file_name in self.card_files),
+                'board': Board.read_csv(self.board_file) if self.csv_board else None,
+                'neighbours': grid.neighbours}
+
+    def get_key(self):
+        ''' Returns the hash of the bundle version, the grid size, the code which builds the pickled objects and the
+        names and contents of all source files. Binary boards are not part of the bundle, so they are not hashed
+        either.'''
+        key = hashlib.sha1(str(self.version).encode())
+        key.update((self.config.get('Grid', 'hexes_x') + ',' + self.config.get('Grid', 'hexes_y')).encode())
+        sources = list(self.card_files)
+        if self.csv_board:
+            sources.append(self.board_file)
+        for file_name in self.code_files:
+            with open(file_name, 'rb') as f:
+                key.update(f.read())
+        for file_name in sources:
+            key.update(file_name.encode() + b'\0')
+            with open(file_name, 'rb') as f:
+                key.update(f.read())
+        return key.hexdigest()
+
+    def load(self):
+        ''' Returns the assets stored in the cache directory, or None if there are none, they are out of date or they
+        cannot be read. Any unpickling error counts, for instance a bundle which refers to a class that was renamed.'''
+        try:
+            with open(self.file_name, 'rb') as f:
+                (key, assets) = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as error:
+            log.warning('Could not load assets from %s, compiling them again: %r', self.file_name, error)
+            return None
+        if key != self.key:
+            log.info('Assets in %s are out of date', self.file_name)
+            return None
+        log.debug('Loaded assets from %s', self.file_name)
+        return assets
+
+    def save(self, assets):
+        ''' Stores the assets in the cache directory. The bundle is written to a temporary file first and then renamed,
+        so a game starting at the same time never reads half a bundle. Failing to save is not an error, the assets are
+        then compiled again at the next start.'''
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.file_name + '.tmp', 'wb') as f:
+                pickle.dump((self.key, assets), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(self.file_name + '.tmp', self.file_name)
+        except OSError as error:
+            log.warning('Could not save assets to %s: %s', self.file_name, error)
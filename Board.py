@@ -0,0 +1,164 @@
+'''Board files. A board lists for every hex the tile type and the player object which starts there, if any. Boards are
+edited as csv files with the columns index, tile, object and owner, separated by ',' or ';'. For large boards they can
+be converted to a binary columnar file, which is memory-mapped when it is loaded: opening it takes no time, only the
+parts of the board which are used are read, and all games playing the same map share its pages. Convert a board from
+the command line with:
+
+python Board.py board.csv board.hexboard
+
+Layout of the binary file, all numbers little endian:
+- a header of 64 bytes: the magic bytes HEXBOARD, the version (uint32), 4 unused bytes, the number of hexes n (uint64)
+  and the offset and length in bytes of the terrain table (uint64),
+- the tile code of each hex, n x uint8,
+- the kind of the object on each hex (Pawn.Kind, 0 for none), n x uint8,
+- the number of the player owning the object on each hex (0 for none), n x uint8,
+- the terrain table: the names of the tile codes, utf-8, separated by newlines.
+'''
+import argparse
+import csv
+import struct
+from array import array
+
+import numpy
+
+import Log
+from Pawn import Kind
+from Terrain import terrain_types
+
+log = Log.get_logger('board')
+
+magic = b'HEXBOARD'
+version = 1
+header = struct.Struct('<8sII3Q')       # magic, version, unused, number of hexes, terrain table offset and length
+header_size = 64
+object_kinds = {'pawn': Kind.PAWN.value, 'boat': Kind.BOAT.value, 'harbour': Kind.HARBOUR.value,
+                'home': Kind.HOME.value}
+
+
+class Board:
+    '''The columns of a board: for each hex the tile code, the kind of the player object which starts there and the
+    number of its owner. The tile codes refer to names, the terrain table of the board, which is the table of
+    Terrain.terrain_types for boards read in this process. The columns may be memory-mapped, see read.'''
+    def __init__(self, tiles, kinds, owners, names):
+        self.tiles = tiles
+        self.kinds = kinds
+        self.owners = owners
+        self.names = names
+        self.n_hexes = len(tiles)
+
+    def get_tiles(self):
+        ''' Returns the tile codes of the board in the codes of terrain_types. If the terrain table of the board matches
+        terrain_types, which it does for all boards with the standard terrains, these are the tiles themselves.'''
+        if list(self.names) == list(terrain_types.names[:len(self.names)]):
+            return self.tiles
+        return terrain_types.get_codes(self.names)[self.tiles]
+
+
+def convert(csv_file, board_file, chunk_rows=65536):
+    ''' Converts a csv board to a binary board. The csv file is read in chunks of chunk_rows rows and the tile codes
+    are written as they come in.'''
+    kinds = array('B')
+    owners = array('B')
+    n_hexes = 0
+    with open(board_file, 'wb') as f:
+        f.write(bytes(header_size))     # The header is written when the size of the board is known
+        for (tiles, chunk_kinds, chunk_owners) in iter_csv(csv_file, chunk_rows):
+            f.write(tiles.tobytes())
+            kinds.extend(chunk_kinds)
+            owners.extend(chunk_owners)
+            n_hexes += len(tiles)
+        f.write(kinds.tobytes())
+        f.write(owners.tobytes())
+        names = '\n'.join(terrain_types.names).encode('utf-8')
+        f.write(names)
+        f.seek(0)
+        f.write(header.pack(magic, version, 0, n_hexes, header_size + 3 * n_hexes, len(names)))
+    log.info('Converted board %s with %s hexes to %s', csv_file, n_hexes, board_file)
+
+
+def iter_csv(file_name, chunk_rows=65536):
+    ''' Reads a csv board in chunks of chunk_rows rows. The delimiter (',' or ';') is detected from the header. Blank
+    rows are skipped, rows without a tile raise a ValueError. Yields for each chunk the tile codes (in terrain_types),
+    the object kinds and the owner numbers as uint8 arrays.'''
+    with open(file_name, newline='', encoding='utf-8-sig') as f:
+        first_line = f.readline()
+        try:
+            delimiter = csv.Sniffer().sniff(first_line, delimiters=',;').delimiter
+        except csv.Error:
+            delimiter = ','
+        reader = csv.reader(f, delimiter=delimiter)
+        rows = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):   # Blank lines, e.g. at the end of an exported file
+                continue
+            if len(row) < 2 or not row[1].strip():     # The header line was read before the reader started counting
+                raise ValueError(file_name + ', line ' + str(reader.line_num + 1) + ': expected index and tile, got ' +
+                                 delimiter.join(row))
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield parse_rows(rows)
+                rows = []
+        if rows:
+            yield parse_rows(rows)
+
+
+def load(file_name):
+    ''' Loads a board file: csv files are read, other files are memory-mapped as binary boards.'''
+    if file_name.lower().endswith('.csv'):
+        return read_csv(file_name)
+    return read(file_name)
+
+
+def parse_object(name, owner, index):
+    ''' Returns the kind and the owner number of a player object in a csv board, or 0, 0 if it is not valid.'''
+    digits = owner[len('player'):] if owner.startswith('player') else ''
+    if name not in object_kinds or not digits.isdigit() or not 0 < int(digits) < 256:
+        log.warning('Unknown object %s of %s on hex %s is ignored', name, owner, index)
+        return 0, 0
+    return object_kinds[name], int(digits)
+
+
+def parse_rows(rows):
+    ''' Returns the tile codes, object kinds and owner numbers of a list of csv rows, see iter_csv.'''
+    tiles = terrain_types.get_codes([row[1] for row in rows])
+    kinds = numpy.zeros(len(rows), dtype=numpy.uint8)
+    owners = numpy.zeros(len(rows), dtype=numpy.uint8)
+    for (i, row) in enumerate(rows):
+        if len(row) > 2 and row[2]:     # Column 2 contains the player objects, column 3 their owners
+            (kinds[i], owners[i]) = parse_object(row[2], row[3] if len(row) > 3 else '', row[0])
+    return tiles, kinds, owners
+
+
+def read(file_name):
+    ''' Memory-maps a binary board. The columns are mapped copy-on-write: the board can be changed in memory, for
+    instance when randomized tiles are replaced, without changing the file, and untouched pages stay shared.'''
+    with open(file_name, 'rb') as f:
+        (file_magic, file_version, unused, n_hexes, names_offset, names_length) = header.unpack(
+            f.read(header.size))
+        if file_magic != magic or file_version != version:
+            raise ValueError(file_name + ' is not a board file of version ' + str(version))
+        f.seek(names_offset)
+        names = f.read(names_length).decode('utf-8').split('\n')
+    if n_hexes == 0:
+        empty = numpy.zeros(0, dtype=numpy.uint8)
+        return Board(empty, empty, empty, names)
+    columns = numpy.memmap(file_name, dtype=numpy.uint8, mode='c', offset=header_size, shape=(3, n_hexes))
+    return Board(columns[0], columns[1], columns[2], names)
+
+
+def read_csv(file_name):
+    ''' Reads a csv board into memory.'''
+    chunks = list(iter_csv(file_name))
+    if not chunks:
+        empty = numpy.zeros(0, dtype=numpy.uint8)
+        return Board(empty, empty, empty, list(terrain_types.names))
+    (tiles, kinds, owners) = (numpy.concatenate(column) for column in zip(*chunks))
+    return Board(tiles, kinds, owners, list(terrain_types.names))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts a csv board file to a binary board file.')
+    parser.add_argument('csv_file', help='csv board to convert')
+    parser.add_argument('board_file', help='name of the binary board to write')
+    args = parser.parse_args()
+    convert(args.csv_file, args.board_file)
@@ -0,0 +1,75 @@
+import collections
+
+import numpy
+
+
+class Cache:
+    '''Least-recently-used cache with a memory budget. Each entry is stored together with its size in bytes. When adding
+    an entry pushes the total size over the budget, the entries which were used longest ago are dropped until the
+    total fits again. The cache counts hits and misses so its effectiveness can be checked.'''
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()    # Maps key -> (value, size). The last entry is the most recently used.
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        ''' Returns the value stored under key and marks it as most recently used, or None if key is not cached.'''
+        try:
+            value, size = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, size):
+        ''' Stores value under key. Values larger than the whole budget are not stored.'''
+        if key in self.entries:
+            self.n_bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.n_bytes += size
+        while self.n_bytes > self.max_bytes:
+            self.n_bytes -= self.entries.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def clear(self):
+        ''' Drops all entries. The hit and miss counters are kept.'''
+        self.entries.clear()
+        self.n_bytes = 0
+
+    def get_stats(self):
+        ''' Returns a one-line summary of the cache use.'''
+        return ('Cache ' + self.name + ': ' + str(len(self.entries)) + ' entries, ' + str(self.n_bytes) + ' of ' +
+                str(self.max_bytes) + ' bytes, ' + str(self.hits) + ' hits, ' + str(self.misses) + ' misses, ' +
+                str(self.evictions) + ' evictions.')
+
+
+class ConnectivityCache(Cache):
+    '''Cache for the results of Hexgrid.get_layers. Entries are keyed by terrain, radius, terrain version and the start
+    hexes. The terrain version is increased by the grid whenever the tiles change; entries of older versions can never
+    be hit again, so they are dropped right away by invalidate.'''
+    def __init__(self, max_bytes):
+        super().__init__('connectivity', max_bytes)
+        self.terrain_version = 0
+
+    def put_layers(self, key, layers):
+        ''' Stores the layers of a query. The arrays are made read-only since they are shared with every later caller.'''
+        for layer in layers:
+            layer.flags.writeable = False
+        self.put(key, layers, sum(layer.nbytes for layer in layers))
+
+    def make_key(self, index_list, conn_list_name, dist):
+        ''' Returns the key of a get_layers query for the current terrain version.'''
+        return conn_list_name, dist, self.terrain_version, tuple(numpy.unique(numpy.array(index_list, dtype=int)).tolist())
+
+    def invalidate(self):
+        ''' Moves the cache to a new terrain version and drops all results of the previous one.'''
+        self.terrain_version += 1
+        self.clear()
@@ -1,88 +1,237 @@
-import itertools  # itertools allows creating multpiple instances in one go.
+import configparser
+import sys
+from array import array  # Stacks store the card type ids in a compact array of unsigned shorts.
+
+import numpy
+
+import Log
+
+log = Log.get_logger('cards')
+
+
+class CardType:
+    '''One kind of card, as described by a section of a card file. All copies of a card share a single CardType, so the
+    properties are parsed only once. Whole numbers, like the resource values earth, wood, stone, metal and fuel and the
+    requirements of assignments, are stored as ints. The collect property is interned and numbered in collect_id, with
+    0 meaning that the card is not a collectible. The number of copies is a property of the card file, not of the card,
+    so it is not stored.'''
+    def __init__(self, card_id, name, properties):
+        self.id = card_id
+        self.name = name
+        for (key, value) in properties:
+            setattr(self, key, value)
+
+
+class CardTypes:
+    '''Registry of all card types. Cards in stacks are referred to by their index in the registry. A card type is
+    registered once for each distinct combination of name and properties, so reading the same card from several files
+    gives the same type.'''
+    resources = ['earth', 'wood', 'stone', 'metal', 'fuel']  # Order of the resource columns in the value table
+
+    def __init__(self):
+        self.types = []
+        self.ids = {}                   # (name, properties) -> card type id
+        self.collect_ids = {'none': 0}  # Name of a collectible -> collect id
+        self.files = {}                 # Card file name -> its cards, see load
+        self.table = None               # Value table, see get_table. Rebuilt after new types are registered.
+
+    def get(self, card_id):
+        ''' Returns the card type with id card_id.'''
+        return self.types[card_id]
+
+    def get_collect_ids(self, names):
+        ''' Returns an array with the collect ids of the comma separated collectible names, as used in the tier2 list of
+        assignments.'''
+        return numpy.array([self.collect_ids.setdefault(name.strip(), len(self.collect_ids))
+                            for name in names.split(',') if name.strip()], dtype=int)
+
+    def get_table(self):
+        ''' Returns the value table of all card types: an int array with a row for each card type holding its resource
+        values (ewsmf), and an array with the collect id of each card type. Indexing them with the ids in a stack gives
+        the values of the cards in the stack.'''
+        if self.table is None:
+            values = numpy.array([[getattr(card, resource, 0) for resource in self.resources] for card in self.types],
+                                 dtype=int).reshape(-1, len(self.resources))
+            collect = numpy.array([getattr(card, 'collect_id', 0) for card in self.types], dtype=int)
+            self.table = (values, collect)
+        return self.table
+
+    def add_file(self, file_name, sections):
+        ''' Registers the cards of a card file, given as the (name, properties, number of copies) sections returned by
+        read_file. Used by load and by the asset bundle, which stores the sections of the card files it compiled.'''
+        self.files[file_name] = tuple((self.register(name, items), copies) for (name, items, copies) in sections)
+
+    def load(self, file_name):
+        ''' Returns the cards of a card file as a tuple of (card type, number of copies) pairs, in the order of the
+        file. Each file is parsed only once, later calls return the same tuple. Decks with other numbers of copies are
+        made by pairing the card types with new numbers, the card types themselves are never changed.'''
+        if file_name not in self.files:
+            self.add_file(file_name, self.read_file(file_name))
+        return self.files[file_name]
+
+    def parse_properties(self, items):
+        ''' Converts the properties of a card file section to their types. Returns a tuple of (key, value) pairs.'''
+        properties = []
+        for (key, value) in items:
+            if key == 'copies':
+                continue
+            if value.lstrip('-').isdigit():
+                value = int(value)
+            elif key == 'collect':
+                value = sys.intern(value)
+                properties.append(('collect_id', self.collect_ids.setdefault(value, len(self.collect_ids))))
+            properties.append((key, value))
+        return tuple(properties)
+
+    def read_file(self, file_name):
+        ''' Parses a card file. Returns a tuple with for each section the name of the card, its properties as (key,
+        value) pairs of strings and its number of copies.'''
+        log.debug('Retrieving cards from %s', file_name)
+        config = configparser.ConfigParser()
+        config.read(file_name)
+        return tuple((name, tuple(config.items(name)), config.getint(name, 'copies')) for name in config.sections())
+
+    def register(self, name, items):
+        ''' Returns the card type with the given name and the properties in items, registering it if it is new.'''
+        properties = self.parse_properties(items)
+        card_id = self.ids.get((name, properties))
+        if card_id is None:
+            card_id = len(self.types)
+            self.types.append(CardType(card_id, name, properties))
+            self.ids[(name, properties)] = card_id
+            self.table = None
+        return self.types[card_id]
+
+
+card_types = CardTypes()  # The one registry shared by all stacks
+
+
+class ResourceSelection:
+    '''The resource cards a player selected from a stack for an assignment. For each card the selection holds the column
+    of the selected resource in the value matrix of the stack (0 to 4 for ewsmf), 5 for a collectible or -1 if the card
+    is not used. The selection keeps running totals of the selected resources and of the selected collectibles which
+    count for the assignment, so changing the selection of one card only applies the difference for that card.'''
+    def __init__(self, values, collect, requirement, wanted, selection):
+        self.values = values                # Resource values (ewsmf) of the cards, see Stack.get_value_matrix
+        self.counts = wanted[collect]       # Whether each card is a collectible which counts for the assignment
+        self.requirement = requirement      # Tier1 requirement (ewsmf)
+        self.selection = numpy.array(selection, dtype=int)
+        used = self.selection[:, None] == numpy.arange(len(card_types.resources))
+        self.totals = (self.values[:len(self.selection)] * used).sum(axis=0)
+        self.n_collect = numpy.count_nonzero((self.selection == len(card_types.resources)) &
+                                             self.counts[:len(self.selection)])
+
+    def get_contribution(self, index, column):
+        ''' Returns the resource totals and the collectible count which card index adds when column is selected.'''
+        totals = numpy.zeros(len(card_types.resources), dtype=int)
+        if 0 <= column < len(card_types.resources):
+            totals[column] = self.values[index, column]
+        return totals, int(column == len(card_types.resources) and self.counts[index])
+
+    def is_tier1_met(self):
+        ''' Returns whether the selected resources add up to the tier1 requirement.'''
+        return bool(numpy.all(self.totals >= self.requirement))
+
+    def select(self, index, column):
+        ''' Changes the selection of card index to column and updates the totals with the difference.'''
+        (old_totals, old_collect) = self.get_contribution(index, self.selection[index])
+        (new_totals, new_collect) = self.get_contribution(index, column)
+        self.totals += new_totals - old_totals
+        self.n_collect += new_collect - old_collect
+        self.selection[index] = column
+
 
 class Stack:
-    '''Class for a stack of cards'''
+    '''Class for a stack of cards. The stack holds the ids of the card types, the cards themselves are CardType objects
+    from the card_types registry.'''
     def __init__(self,name):
         self.stack_name = name
-        print('Card stash ' + self.stack_name + ' created')
-        self.stack = []
+        log.debug('Card stash %s created', self.stack_name)
+        self.stack = array('H')
 
-    def create_cards_from_file(self,file_name):
-        ''' Creates a stack of cards based on specifications in a config file.'''
-        import configparser
-        print('Retrieving cards from ' + file_name)
-        config = configparser.ConfigParser()
-        config.read(file_name)
-        for this_card in config.sections():
-            temp = lambda: 0
-            temp.name = this_card
-            copies = config.getint(this_card,'copies')
+    def create_cards(self, cards):
+        ''' Adds the cards in a list of (card type, number of copies) pairs to the stack, see CardTypes.load.'''
+        for (card, copies) in cards:
             if copies == 1:
-                print('Creating 1 copy of card ' + this_card + ' in stash ' + self.stack_name)
+                log.debug('Creating 1 copy of card %s in stash %s', card.name, self.stack_name)
             if copies > 1:
-                print('Creating ' + str(copies) + ' copies of card ' + this_card + ' in stash ' + self.stack_name)
-            for (key,value) in config.items(this_card):      # Loop over the properties of the card
-                setattr(temp,key,value)                      # Add the property to the temp card
-            self.stack.extend(itertools.repeat(temp, copies))# Add the specified number of copies of the card in temp to the stack
+                log.debug('Creating %s copies of card %s in stash %s', copies, card.name, self.stack_name)
+            self.stack.extend(array('H', [card.id]) * copies)   # Add the specified number of copies of the card to the stack
             self.log_stack_size()
 
+    def create_cards_from_file(self,file_name):
+        ''' Creates a stack of cards based on specifications in a config file.'''
+        self.create_cards(card_types.load(file_name))
+
     def create_dummy(self):
-        # Creates an empty dummy card
-        dummy = lambda: 0
-        dummy.name = 'empty'
-        return dummy
+        # Returns the empty dummy card
+        return card_types.register('empty', [])
 
     def give_card(self,target_stack):
         # Actively give the top card to the stack passed in target_Stack
         try:
-            card_back = target_stack.receive_card(self.stack.pop())  # Give the last card in the stack to the target stack
-            print('Stash ' + self.stack_name + ' gives a card to stash ' + target_stack.stack_name + '. Stash ' + self.stack_name + ' has ' + str(self.get_size()) + ' cards left.')
+            card_back = target_stack.receive_card(card_types.get(self.stack.pop()))  # Give the last card in the stack to the target stack
+            log.debug('Stash %s gives a card to stash %s. Stash %s has %s cards left.',
+                      self.stack_name, target_stack.stack_name, self.stack_name, self.get_size())
             if card_back.name != 'empty':  # If the target stack rejected the card, we put it back where it was.
-                self.stack.append(card_back)
-                print('Stash ' + target_stack.stack_name + ' rejected the card.')
+                self.stack.append(card_back.id)
+                log.debug('Stash %s rejected the card.', target_stack.stack_name)
             else:
                 self.log_stack_size()
         except IndexError:
-            print('Stash ' + self.stack_name + ' is empty, failed to give card to ' + target_stack.stack_name)
+            log.debug('Stash %s is empty, failed to give card to %s', self.stack_name, target_stack.stack_name)
             return self.create_dummy()
 
     def give_selected_card(self,target_stack,index):
         # Actively give the selected card to the target_stack.
         try:
-            card_back = target_stack.receive_card(self.stack.pop(index)) # Give the last card in the stack to the target stack
-            print('Stash ' + self.stack_name + ' gives a card to stash ' + target_stack.stack_name)
+            card_back = target_stack.receive_card(card_types.get(self.stack.pop(index))) # Give the last card in the stack to the target stack
+            log.debug('Stash %s gives a card to stash %s', self.stack_name, target_stack.stack_name)
             if card_back.name != 'empty':   # If the target stack rejected the card, we put it back where it was.
-                self.stack.insert(index,card_back)
-                print('Stash ' + target_stack.stack_name + ' rejected the card.')
+                self.stack.insert(index,card_back.id)
+                log.debug('Stash %s rejected the card.', target_stack.stack_name)
             else:
                 self.log_stack_size()
         except IndexError:
-            print('Stash ' + self.stack_name + ' is empty, failed to give card to ' + target_stack.stack_name)
+            log.debug('Stash %s is empty, failed to give card to %s', self.stack_name, target_stack.stack_name)
             return self.create_dummy()
 
+    def get_card(self, index):
+        ''' Returns the card at position index in the stack.'''
+        return card_types.get(self.stack[index])
+
     def get_size(self):
         return len(self.stack)
 
+    def get_value_matrix(self):
+        ''' Returns the resource values of the cards in the stack as an int array with a row for each card and a column
+        for each resource (ewsmf), and an array with the collect id of each card. Since the stack holds card type ids,
+        the matrix is a lookup in the value table of card_types and always matches the current stack.'''
+        (values, collect) = card_types.get_table()
+        ids = numpy.array(self.stack, dtype=int)
+        return values[ids], collect[ids]
+
     def take_card(self,target_stack):
         # Actively take a card from the passed stack
         taken_card = target_stack.lose_card()
         if taken_card.name == 'empty':
-            print('Stash ' + self.stack_name + ' failed to take  a card from stash ' + target_stack.stack_name + ' since it is empty')
+            log.debug('Stash %s failed to take  a card from stash %s since it is empty',
+                      self.stack_name, target_stack.stack_name)
         else:
-            print('Stash ' + self.stack_name + ' takes  a card from stash ' + target_stack.stack_name)
+            log.debug('Stash %s takes  a card from stash %s', self.stack_name, target_stack.stack_name)
             self.log_stack_size()
-            self.stack.append(taken_card)
+            self.stack.append(taken_card.id)
 
     def log_stack_size(self):
-        print('Stack ' + self.stack_name + ' has ' + str(self.get_size()) + ' cards.')
+        log.debug('Stack %s has %s cards.', self.stack_name, self.get_size())
 
     def receive_card(self,card_in):
         # Passively receive a card from another stack
         if card_in.name == 'dummy':
-            print('Stash ' + self.stack_name + ' did NOT receive a card')
+            log.debug('Stash %s did NOT receive a card', self.stack_name)
         else:
-            self.stack.append(card_in)
-            print('Stash ' + self.stack_name + ' gains a card')
+            self.stack.append(card_in.id)
+            log.debug('Stash %s gains a card', self.stack_name)
             self.log_stack_size()
 
         return self.create_dummy() # Return a dummy. Needed for consistency with the sized stack, which can return the passed card if the stack is full.
@@ -90,30 +239,35 @@ class Stack:
     def lose_card(self):
         # Passively lose a card to another stack
         try:
-            cardOut = self.stack.pop()
-            print('Stash ' + self.stack_name + ' loses a card')
+            cardOut = card_types.get(self.stack.pop())
+            log.debug('Stash %s loses a card', self.stack_name)
             self.log_stack_size()
             return cardOut
         except IndexError:  # Stack is empty
-            print('Stash ' + self.stack_name + ' is empty!')
+            log.debug('Stash %s is empty!', self.stack_name)
             return self.create_dummy()
 
     def print_stack(self):
         # Prints a list of all cards in the stack
-        print('Stack ' + self.stack_name + ' contains the following cards')
-        for card in self.stack:
-            print('        ' + card.name)
+        log.debug('Stack %s contains the following cards', self.stack_name)
+        for card_id in self.stack:
+            log.debug('        %s', card_types.get(card_id).name)
 
 class DrawPile(Stack):
-    def __init__(self,file_name,label):
+    '''A shuffled stack of cards. The cards are either read from a card file, when cards is a file name, or given as a
+    list of (card type, number of copies) pairs, which is how the game builds its decks in memory.'''
+    def __init__(self,cards,label):
         super().__init__(label)
-        # Read the card info from the file and create the cards
-        self.create_cards_from_file(file_name)
+        if isinstance(cards, str):
+            # Read the card info from the file and create the cards
+            self.create_cards_from_file(cards)
+        else:
+            self.create_cards(cards)
         # Shuffle the cards
         self.shuffle_stack()
 
     def shuffle_stack(self):
-        print('Shuffling ' + self.stack_name)
+        log.debug('Shuffling %s', self.stack_name)
         #self.print_stack()
         from random import shuffle
         shuffle(self.stack)
@@ -122,33 +276,33 @@ class DrawPile(Stack):
 class SizedStack(Stack):
     def __init__(self,name,size):
         self.stack_name = name
-        self.stack = []
+        self.stack = array('H')
         self.stack_size = size
 
     def take_card(self, target_stack):
         '''Runs the Stack take_card function only if the stack is not full. '''
         if len(self.stack) < self.stack_size:
-            print('Stack ' + self.stack_name + ' takes a card from ' + target_stack.name)
+            log.debug('Stack %s takes a card from %s', self.stack_name, target_stack.name)
             super().take_card(target_stack)
         else:
-            print('Stack ' + self.stack_name + ' is full. No card taken from ' + target_stack.name)
+            log.debug('Stack %s is full. No card taken from %s', self.stack_name, target_stack.name)
 
     def receive_card(self, card_in):
         '''Runs the Stack receive_card function only if the stack is not full. If it is full, the received card is returned.'''
         if len(self.stack) < self.stack_size:
-            print('Stack ' + self.stack_name + ' receives a card')
+            log.debug('Stack %s receives a card', self.stack_name)
             super().receive_card(card_in)
             return self.create_dummy()
         else:
-            print('Stack ' + self.stack_name + ' is full, returning received card.')
+            log.debug('Stack %s is full, returning received card.', self.stack_name)
             return card_in
 
     def lose_card(self, index):
         ''' Returns a card by index and pops it from the stack. '''
         try:
-            cardOut = self.stack.pop(index)
-            print('Stash ' + self.stack_name + ' loses a card')
+            cardOut = card_types.get(self.stack.pop(index))
+            log.debug('Stash %s loses a card', self.stack_name)
             return cardOut
         except IndexError:  # Stack does not have a resource and index
-            print('Card not found!')
+            log.debug('Card not found!')
             return self.create_dummy()
\ No newline at end of file
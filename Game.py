@@ -1,17 +1,23 @@
-# os module is used for deleting generated config files when the program is closed
-import os
 import configparser
+# copy is used to give each player an own copy of the assignment card
+import copy
 import math
 
-# The numpy package is used for connectivity matrix manipulation and solving the linear resource requirement equations.
+# The numpy package is used for solving the linear resource requirement equations.
 import numpy
 
 # Pawn class for the land pawns, boats and home towns
-from Pawn import Pawn, Harbour, Boat, Home
+from Pawn import Pawn, Harbour, Boat, Home, Kind
 # Cards class for managing drawpiles of land tiles and resource cards
-from Cards import DrawPile, Stack
+from Cards import DrawPile, ResourceSelection, Stack, card_types
+# Solver for picking the cheapest resources which fulfill an assignment
+from Solver import ResourceSolver
 # The randomize function for shuffling the player order
 from random import shuffle
+# Logging facade, the game messages are logged by the game subsystem
+import Log
+
+log = Log.get_logger('game')
 
 
 class Game:
@@ -44,7 +50,7 @@ class Game:
     - fulfill_tier2: fulfills the requirement of the plyer's tier2 assignment by removing the appropriate resources
     - game_over: checks whether the game's end conditions have been reached.
     - get_current_player: returns a reference to the object of the current player
-    - quit: Cleans up the generated card config files and kills the program
+    - quit: Kills the program
     - shift_resources: Moves selected resources from one stakck to another.
         !!! The checkboxes are interface specific, move (part of) function to visualiser
     - update_card_counts: Initiates updating the visualization of the card counts of the resource drawpiles.
@@ -55,7 +61,7 @@ class Game:
     - adjust_resources: adjusts resource requirement determined by get_required_resources as specified in config
     - get_resource_matrix: constructs a list of card names and the matrix with the number of each resource in it
     - calculate_resources: calculate the number of each resource card needed    
-    - gen_res_conf: generates the resource config files of each landscape type as calculated using calculate_resources
+    - build_landscape_decks: builds the resource deck of each landscape type as calculated using calculate_resources
     
     """
 
@@ -95,6 +101,10 @@ class Game:
         # does get triggered (by the game_end function in this class), each player gets on more turn and the number
         # remaining turns is administrated with this counter.
         self.turns_till_end = -1
+        # Running totals of the resources selected in the assignment popup, see check_assignment.
+        self.resource_selection = None
+        # Solver for the auto-select option of the assignment popup.
+        self.resource_solver = ResourceSolver()
 
         # Loop over the players to create struct for each containing their playing pieces. The playing pieces which
         # need to be created are stored in the grid object.
@@ -110,16 +120,17 @@ class Game:
             new_player.points = 0
 
             # Assign an assignment to the player by drawing one from the assignment stack.
-            new_player.assignment = self.assignment_stack.lose_card()
+            # The card type is shared by all copies of the card, the player gets an own copy to keep track of progress.
+            new_player.assignment = copy.copy(self.assignment_stack.lose_card())
             # Each assignment has two phases: tier 1 and tier 2. Tier 1 needs to be completed before tier 2 can be
             # worked on. We keep track of resources spent on each tier by maintinging resource stacks for the
             # tier 1 and tier 2 assignments.
             new_player.assignment.tier1_stack = Stack(new_player.label + '_tier1')
             new_player.assignment.tier2_stack = Stack(new_player.label + '_tier2')
 
-            # Find the player's objects in the grid.objects list and initialize them. First, extract indices of board
-            # tiles which contain an object labeled as 'init' and have the player's label assigned to them.
-            objects_index = [dummy for dummy, x in enumerate(grid.objects_init) if 'init_' + new_player.label in x]
+            # Find the player's objects on the board and initialize them. First, extract indices of board tiles which
+            # contain an object owned by the player.
+            objects_index = numpy.flatnonzero(grid.object_owners == i).tolist()
             # Make counters for tracking the number of pawns and boats generated. This is needed for labelling them.
             pawn_counter = 0
             boat_counter = 0
@@ -129,8 +140,9 @@ class Game:
 
             # Loop over the indices of tiles containing the current player's pieces and create them.
             for index in objects_index:
+                kind = grid.object_kinds[index]
                 # The current piece is a harbour (these are the towns on the island where the resources are dug):
-                if 'harbour' in grid.objects_init[index]:
+                if kind == Kind.HARBOUR.value:
                     # Create a harbour object.
                     new_harbour = Harbour(new_player.label, new_player.label + 'harbour', new_player.color, 'land')
                     # Add the harbour object to the player struct.
@@ -139,7 +151,7 @@ class Game:
                     grid.place_object(new_harbour, index)
 
                 # If the current piece is a pawn:
-                elif 'pawn' in grid.objects_init[index]:
+                elif kind == Kind.PAWN.value:
                     # Increase the pawn counter.
                     pawn_counter = pawn_counter + 1
                     # Create a new pawn. Specify the player label, the label of the pawn (player label + the word 'team'
@@ -157,7 +169,7 @@ class Game:
                     grid.place_object(new_pawn, index)
 
                 # If the current piece is a boat:
-                elif 'boat' in grid.objects_init[index]:
+                elif kind == Kind.BOAT.value:
                     # Increase the boat counter.
                     boat_counter = boat_counter + 1
                     # Create a new boat object. Specify player label, boat label, player color, the fact that it only
@@ -175,12 +187,12 @@ class Game:
                     # Add the boat the player structure.
                     setattr(self, new_boat.label, new_boat)
                     # Add the boat's label to the list of boats.
-                    new_player.pawn_list.append(getattr(self, new_boat.label))
+                    new_player.boat_list.append(getattr(self, new_boat.label))
                     # Place the boat on the play boatrd.
                     grid.place_object(new_boat, index)
 
                 # If the current object is a home base (the towns on the destination island):
-                elif 'home' in grid.objects_init[index]:
+                elif kind == Kind.HOME.value:
                     # Create a new home object.
                     new_home = Home(new_player.label, new_player.label + 'home', new_player.color, 'home')
                     # Add the home to the player struct.
@@ -190,15 +202,17 @@ class Game:
 
                 # If none of the above play pieces are found, something went wrong and the produce and error.
                 else:
-                    self.visualiser.log('Unknown object ' + grid.objects[index] + ' during init of player '
-                                        + new_player.name)
+                    log.warning('Unknown object %s during init of player %s', kind, new_player.name)
 
             # Add the new player struct to self.
             setattr(self, new_player.label, new_player)
             # Add the player's label to the list for managing turn order.
             self.player_order[i-1] = new_player.label
             # Report on the creation of the new player.
-            self.visualiser.log('Created player ' + self.player_order[i-1])
+            log.info('Created player %s', self.player_order[i-1])
+
+        # With all harbours and homes on the board, compute the distance from each of them to every hex.
+        grid.build_distance_fields()
 
         # In the next block, derive the number of each resource card type to be added to the game and distribute them
         # over the landscapes.
@@ -210,14 +224,14 @@ class Game:
         [cards, value_matrix] = self.get_resource_matrix()
         # Calculate the number of each resource card to be added to the game (excluding specials).
         res_count = self.calculate_resources(req_corr, value_matrix)
-        # Creaate an ini temp file for each landscape type
-        self.gen_res_conf(res_count, cards)
-        # Create the resource draw stacks for each terrain type using the generated ini files.
-        self.swamp_drawpile = DrawPile(config.get('Game', 'swamp_resources'), 'swamp_drawpile')
-        self.rock_drawpile = DrawPile(config.get('Game', 'rock_resources'), 'rock_drawpile')
-        self.forest_drawpile = DrawPile(config.get('Game', 'forest_resources'), 'forest_drawpile')
-        self.meadow_drawpile = DrawPile(config.get('Game', 'meadow_resources'), 'meadow_drawpile')
-        self.sand_drawpile = DrawPile(config.get('Game', 'sand_resources'), 'sand_drawpile')
+        # Distribute the resource cards over the landscape types.
+        decks = self.build_landscape_decks(res_count, cards)
+        # Create the resource draw stacks for each terrain type from the decks.
+        self.swamp_drawpile = DrawPile(decks['swamp'], 'swamp_drawpile')
+        self.rock_drawpile = DrawPile(decks['rock'], 'rock_drawpile')
+        self.forest_drawpile = DrawPile(decks['forest'], 'forest_drawpile')
+        self.meadow_drawpile = DrawPile(decks['meadow'], 'meadow_drawpile')
+        self.sand_drawpile = DrawPile(decks['sand'], 'sand_drawpile')
 
         # Randomize the player order.
         shuffle(self.player_order)
@@ -252,21 +266,17 @@ class Game:
 
         # Instruct the visualiser object to highlight the objects of the players which have moves for this turn.
         # NB: This does not include homes, harbours and boats without pawns in them.
-        # Loop over all tiles...
-        for i in range(self.grid.n_hexes):
-            # ... and if an object is found ....
-            if self.grid.objects[i]:
-                # ... which belongs to the activated player...
-                if self.grid.objects[i].owner == self.player_order[index]:
-                    # ... remove the visualisation of the objects...
-                    self.visualiser.remove_object(i)
-                    # ... snd redraw them.
-                    # If the object has moves for this turn, the visualiser draws them highlighted.
-                    if self.grid.objects[i].moves > 0:
-                        self.visualiser.draw_object(i, self.grid.objects[i], 'highlight')
-                    # If there are no moves for this turn, the object is drawn non-highlighted.
-                    else:
-                        self.visualiser.draw_object(i, self.grid.objects[i])
+        # Loop over the objects on the board which belong to the activated player...
+        for i, piece in self.grid.pieces.get_player_pieces(self.player_order[index]).items():
+            # ... remove the visualisation of the objects...
+            self.visualiser.remove_object(i)
+            # ... snd redraw them.
+            # If the object has moves for this turn, the visualiser draws them highlighted.
+            if piece.moves > 0:
+                self.visualiser.draw_object(i, piece, 'highlight')
+            # If there are no moves for this turn, the object is drawn non-highlighted.
+            else:
+                self.visualiser.draw_object(i, piece)
 
     def adjust_resources(self, req):
         """" Apply the intercepts and slopes specified in the config files to the resource requirements. Resource order 
@@ -295,18 +305,12 @@ class Game:
         # offset.
         req_adj = numpy.add(numpy.multiply(req, slope), offset)
         # Report on the adjustments
-        self.visualiser.log('Adjusting resource requirements as follows '
-                            '(result = requirement x multiplyier + n_player x offset')
-        self.visualiser.log('Earth: ' + str(req[0]) + ' x ' + str(slope[0]) + ' + '
-                            + str(offset[0]) + ' = ' + str(req_adj[0]))
-        self.visualiser.log('Wood: ' + str(req[1]) + ' x ' + str(slope[1]) + ' + '
-                            + str(offset[1]) + ' = ' + str(req_adj[1]))
-        self.visualiser.log('Stone: ' + str(req[2]) + ' x ' + str(slope[2]) + ' + '
-                            + str(offset[2]) + ' = ' + str(req_adj[2]))
-        self.visualiser.log('Metal: ' + str(req[3]) + ' x ' + str(slope[3]) + ' + '
-                            + str(offset[3]) + ' = ' + str(req_adj[3]))
-        self.visualiser.log('Fuel: ' + str(req[4]) + ' x ' + str(slope[4]) + ' + '
-                            + str(offset[4]) + ' = ' + str(req_adj[4]))
+        log.info('Adjusting resource requirements as follows (result = requirement x multiplyier + n_player x offset')
+        log.info('Earth: %s x %s + %s = %s', req[0], slope[0], offset[0], req_adj[0])
+        log.info('Wood: %s x %s + %s = %s', req[1], slope[1], offset[1], req_adj[1])
+        log.info('Stone: %s x %s + %s = %s', req[2], slope[2], offset[2], req_adj[2])
+        log.info('Metal: %s x %s + %s = %s', req[3], slope[3], offset[3], req_adj[3])
+        log.info('Fuel: %s x %s + %s = %s', req[4], slope[4], offset[4], req_adj[4])
         # Return the result.
         return req_adj
 
@@ -338,7 +342,107 @@ class Game:
             self.grid.select_object(index)
         # Any other value for fuel_index is invalid.
         else:
-            self.visualiser.log('Invalid fuel selection!')
+            log.warning('Invalid fuel selection!')
+
+    def build_landscape_decks(self, res_count, cards):
+        """Builds the resource deck of each landscape type in memory.
+
+        Each landscape has it's own associated resource as follows:
+        Sand: earth, forest: wood, meadow: stone, rock: metal, swamp: fuel.
+        Each terrain type stack contains 6/10 specials of it's own resource type and 1 of each of the other four.
+        Each terrain type stack contains the 3-valued cards of its own resource type, the rest is distributed evenly.
+
+        Arguments:
+            - res_count: number of cards of each type to generate
+            - cards: name of the cards corresponding to res_count.
+
+        Returns a dict with for each landscape type a list of (card type, number of copies) pairs, from which its draw
+        pile is created. Every deck lists all resource and special cards in the order of the card files, cards which do
+        not belong to the landscape get 0 copies.
+
+        """
+        log.info('Creating landscape drawpiles...')
+        # Lists of terrain types and associated resources. The specials are not in this list and are handled separately.
+        terrains = ['sand', 'forest', 'meadow', 'rock', 'swamp']
+        resources = ['earth', 'wood', 'stone', 'metal', 'fuel']
+
+        # All resource and special cards, as parsed from the card files.
+        deck = (card_types.load(self.config.get('Game', 'resources'))
+                + card_types.load(self.config.get('Game', 'specials')))
+        card_by_name = dict((card.name, card) for (card, copies) in deck)
+        # Number of copies of each card for each terrain, starting from the numbers in the card files.
+        terr = dict((terrain, dict((card.name, copies) for (card, copies) in deck)) for terrain in terrains)
+
+        # Loop over the resource cards and distribute the number in res_count over the resource piles.
+        for i in range(0, len(cards)):
+            # Retrieve the values for the next card in the stack:
+            this_card = card_by_name[cards[i]]
+            # Number of copies of the card to distribute.
+            this_number = int(res_count[i][0])
+
+            log.info('Distributing %s copies of resource card %s', this_number, this_card.name)
+
+            # Flag to indicate whether we ran into a 3-valued card. If not, it needs to be distributed later.
+            isthree = False
+            # Loop over terrains and distribute the current resource card count.
+            for j, k in zip(resources, terrains):
+                # In case of a 3-valued resource, give the landscape of that resource all copies.
+                if getattr(this_card, j) == 3:
+                    terr[k][this_card.name] = this_number
+                    log.info('    ...adding %s copies to %s', this_number, k)
+                    isthree = True
+                # If the resource card does not have a resource value of three for the preferred resource, set the card
+                # count to 0. Part of these are overwritten in the next code block.
+                else:
+                    terr[k][this_card.name] = 0
+
+            # We divide the other cards by five and distribute evenly. The round-off error is handled by giving
+            # sand, forest, meadow and swamp rounded 1/5 of the cards, and substracting the rounded from the total to
+            # get the number for rock. This corrects for the fact that rock is a bit underpopulated since metal is
+            # relatively rare in the game.
+            # Do this for any card that is not a three for the current landscape.
+            if not isthree:
+                # Calculate the card count for all stacks except rock.
+                fraction = math.floor(this_number/5)
+                # Calculate the number for the rock stack.
+                rest = this_number - 4*fraction
+                # Put numbers for all five terrain types in one list.
+                distribute = [fraction, fraction, fraction, rest, fraction]
+                # Loop over the five terrain types and set the card counts as in distribute.
+                for j, k in zip(terrains, distribute):
+                    terr[j][this_card.name] = k
+                    log.info('    ...adding %s copies to %s', k, j)
+
+        # Next, we handle the special cards. Retrieve specials only and shuffle.
+        temp_cards = DrawPile(self.config.get('Game', 'specials'), 'temp')
+        # Counters for the number of each special type already assigned.
+        counter = dict((i, 0) for i in resources)
+        # Make a distribution list for each special type. The randimization is handled by the shuffling of the
+        # DrawPile above. The dominant terrain for the special type is repeated 5x, the sixth is already in terrains.
+        dist = dict((i, [terrains[resources.index(i)]]*5 + terrains) for i in resources)
+
+        # Loop over the specials and the set the card counts for each landscape, ie to 1 or 0 depending on how many of
+        # the same collectible were already encountered. This is managed by counting how many of the same type of
+        # collectible were already encountered and using this counter to index the dist list declared above.
+        for i in range(0, temp_cards.get_size()):
+            # Pop the topmost card from the collectibles stack.
+            this_card = temp_cards.lose_card()
+            # Retrieve the corresponding landscape by finding the index of the collectible type in the resource list.
+            this_res = [j for j in resources if this_card.collect[0:4] in j]
+            # Retrieve the terrain type the card is assigned to.
+            this_terrain = dist[this_res[0]][counter[this_res[0]]]
+
+            # Set the card counts for all terrain types to 0 except for this_terrain which is 1.
+            for k in terrains:
+                if k == this_terrain:
+                    terr[k][this_card.name] = 1
+                    log.info('Assigning 1 copy of %s to %s', this_card.name, k)
+                else:
+                    terr[k][this_card.name] = 0
+            # Increase the counter for the current collectible type.
+            counter[this_res[0]] += 1
+
+        return dict((k, [(card, terr[k][card.name]) for (card, copies) in deck]) for k in terrains)
 
     def calculate_resources(self, req, value_matrix):
         """Calculate the number of each resource card needed tot satisfy the required number of each resource type.
@@ -356,57 +460,56 @@ class Game:
 
         # Count the resource totals per type (excluding the specials) and report on them.
         res_total = numpy.inner(value_matrix, numpy.transpose(rounded))
-        self.visualiser.log('Generated resources (excluding specials): ')
-        self.visualiser.log('Earth required: ' + str(req[0]) + ', achieved: ' + str(res_total[0]))
-        self.visualiser.log('Wood required: ' + str(req[1]) + ', achieved: ' + str(res_total[1]))
-        self.visualiser.log('Stone required: ' + str(req[2]) + ', achieved: ' + str(res_total[2]))
-        self.visualiser.log('Metal required: ' + str(req[3]) + ', achieved: ' + str(res_total[3]))
-        self.visualiser.log('Fuel required: ' + str(req[4]) + ', achieved: ' + str(res_total[4]))
+        log.info('Generated resources (excluding specials): ')
+        log.info('Earth required: %s, achieved: %s', req[0], res_total[0])
+        log.info('Wood required: %s, achieved: %s', req[1], res_total[1])
+        log.info('Stone required: %s, achieved: %s', req[2], res_total[2])
+        log.info('Metal required: %s, achieved: %s', req[3], res_total[3])
+        log.info('Fuel required: %s, achieved: %s', req[4], res_total[4])
         # Return the result.
         return rounded
 
-    def check_assignment(self, index, res_select, assignment):
+    def auto_select_resources(self, index, assignment, objective='cards'):
+        """Returns the cheapest selection of resource cards in the stack of the object on tile index which fulfills the
+        tier1 requirement of the assignment, in the format of get_selection. Collectibles are never selected. Returns
+        None if the resources in the stack are not enough.
+
+        Arguments:
+            - index: identifies the currently selected tile of the player board
+            - assignment: the assignment card object which needs to be fulfilled.
+            - objective: 'cards' to use as few cards as possible, 'waste' to spend as little resource value as possible.
+
+        """
+        return self.resource_solver.solve(self.grid.objects[index].resources, self.get_tier1_requirement(assignment),
+                                          objective)
+
+    def check_assignment(self, index, res_select, assignment, changed=None):
         """Checks whether selected resources fulfill the tier1 or tier2 assignments.
         
+        The totals of the selection are kept in self.resource_selection. When only the card with index changed in the
+        stack was toggled, just the difference for that card is applied; otherwise the selection is built anew from
+        all cards.
+
         Arguments:
             - index: identifies the currently selected tile of the player board
             - res_select: tkinter variables indicating which property of each resource card is selected
             - assignment: the assignment card object which needs to be checked.
+            - changed: index in the stack of the card whose selection changed, or None to check all cards.
         
         """
-        # Using the grid and index, retrieve the resources in the stack of the object located on the selected tile.
-        # Get direct reference to the resource stack
-        res = self.grid.objects[index].resources.stack
-
-        # Create an empty struct for sturing the resource counts.
-        def temp(): return 0
-        # Initialize the resource counters for keeping track of the total of the selected resource cards.
-        temp.earth = 0
-        temp.wood = 0
-        temp.stone = 0
-        temp.metal = 0
-        temp.fuel = 0
-        temp.collect = 0
-
-        # Loop over the selected resources and add up the resource counts
-        for i in range(0, len(res_select)):
-            # Count collectibles if they match the assigment's tier2 objective.
-            if res_select[i].get() == 'collect' and assignment.tier2.find(res[i].collect) != 'none':
-                temp.collect += 1
-            # Count the non-collectibles.
-            elif res_select[i].get() != 'none':
-                this_res = getattr(temp, res_select[i].get())
-                this_res += int(getattr(res[i], res_select[i].get()))
-                setattr(temp, res_select[i].get(), this_res)
+        if changed is None or self.resource_selection is None:
+            # Using the grid and index, retrieve the resource values of the cards in the stack of the object located
+            # on the selected tile, and start a new selection from the resource selected for each card.
+            [values, collect] = self.grid.objects[index].resources.get_value_matrix()
+            self.resource_selection = ResourceSelection(values, collect, self.get_tier1_requirement(assignment),
+                                                        self.get_tier2_mask(assignment), self.get_selection(res_select))
+        else:
+            # Only apply the difference of the toggled card.
+            self.resource_selection.select(changed, self.get_selection_column(res_select[changed].get()))
 
         # If tier1 of the assignment is unfulfilled and the resource count of the selection fulfills the tier1
         # requirements, then activate the tier1 fulfill button.
-        if (assignment.tier1_fulfilled == '0' and
-                temp.earth >= int(assignment.tier1_req_earth) and
-                temp.wood >= int(assignment.tier1_req_wood) and
-                temp.stone >= int(assignment.tier1_req_stone) and
-                temp.metal >= int(assignment.tier1_req_metal) and
-                temp.fuel >= int(assignment.tier1_req_fuel)):
+        if assignment.tier1_fulfilled == 0 and self.resource_selection.is_tier1_met():
             self.visualiser.ass_enable_1(True)
         # If the requirements of the tier1 assignment are not met, the tier1 fulfull button is disabled.
         else:
@@ -414,7 +517,7 @@ class Game:
 
         # If tier1 is fulfilled and any of the selected resources fulfills the tier2 requirement (ie it is a collectible
         # of the correct type), then enable the tier2 fulfill button.
-        if assignment.tier1_fulfilled == '1' and temp.collect > 0:
+        if assignment.tier1_fulfilled == 1 and self.resource_selection.n_collect > 0:
             self.visualiser.ass_enable_2(True)
         # In any other case the tier2 fulfill button is disabled.
         else:
@@ -428,21 +531,17 @@ class Game:
         """
 
         # Log message indicating that the player is being deactivated.
-        self.visualiser.log('Deactivating player ' + self.player_order[index])
+        log.info('Deactivating player %s', self.player_order[index])
         # Message to UI to indicate that the player ended her/his turn.
         self.visualiser.message(self.player_order[index] + ' ended her/his turn.')
         # Update the scores.
         self.update_points()
         # Deselected any object which may still be selected.
         self.grid.deselect_object()
-        # Loop over all board tiles to find objects of the current player.
-        for i in range(self.grid.n_hexes):
-            if self.grid.objects[i]:
-                # If an object is found which belongs to the player being deactivated, remove it and redraw it as
-                # unselected.
-                if self.grid.objects[i].owner == self.player_order[index]:
-                    self.visualiser.remove_object(i)
-                    self.visualiser.draw_object(i, self.grid.objects[i])
+        # Remove the objects on the board which belong to the player being deactivated and redraw them as unselected.
+        for i, piece in self.grid.pieces.get_player_pieces(self.player_order[index]).items():
+            self.visualiser.remove_object(i)
+            self.visualiser.draw_object(i, piece)
     
     def end_player_turn(self):
         """Ends the current player's turn by activating the next player. If the last player in the sequence ends his
@@ -453,7 +552,7 @@ class Game:
         self.deactivate_player(self.player_index)
         # Check whether the game is over.
         if self.game_over():
-            self.visualiser.log('Game over!')
+            log.info('Game over!')
         # Ativate the next player in sequence if player is not the last player.
         elif self.player_index < self.n_players-1:
             self.activate_player(self.player_index+1)
@@ -469,7 +568,7 @@ class Game:
             # Activate the player.
             self.activate_player(0)
             # Throw a log message that a new turn has started.
-            self.visualiser.log('New turn (' + str(self.turn) + '), activating ' + self.current_player)
+            log.info('New turn (%s), activating %s', self.turn, self.current_player)
 
     def fulfill_tier1(self, index, res_select, assignment, window):
         """Fulfills the requirement of the tier1 assignment by removing the appropriate resources. 
@@ -487,59 +586,35 @@ class Game:
             - window: handle to the popup window with the resource selections.
         """
         # Show a message.
-        self.visualiser.log('Attempting to fulfull tier 1 assigment...')
+        log.info('Attempting to fulfull tier 1 assigment...')
         # Get a shorter reference to the resource stack
         res = self.grid.objects[index].resources
 
-        # Create a dummy object for containing the resource counts. Initialize the values to the requirements of the
-        # assignment and subtract the selected attributes of the passed resource cards. By putting the counters in a
-        # struct, each can be accessed using a getattr with the string of the resource properties in the resource cards.
-        def counter(): return 0
-        counter.earth = int(assignment.tier1_req_earth)
-        counter.wood = int(assignment.tier1_req_wood)
-        counter.stone = int(assignment.tier1_req_stone)
-        counter.metal = int(assignment.tier1_req_metal)
-        counter.fuel = int(assignment.tier1_req_fuel)
-
-        # fulfilling the assignment. Stop the loop when the assignment is fulfilled. The resources which help in
-        # fulfulling the assignment are transferred to the assignment tier1 stack. If the loop ends but the assignment
-        # is not fulfilled (this should not happen as the fulfill button is only enabled when the selected resources
-        # are enough), all resources are pushed back to the home stack.
-        # Loop over the selected resources
-        # Loop over the selected resources backwards until the assignment is met. By looping backwar we don't get
-        # indexing problems when we pop a resource.
-        i = res.get_size() - 1
-        while assignment.tier1_fulfilled == '0' and i >= 0:
-            # We only work on the selected resources
-            if res_select[i].get() != 'none':
-                # Check whether the selected resource attribute contributes to fulfulling the assignment
-                if getattr(counter, res_select[i].get()) > 0:
-                    # Deduct the resource value from the appropriate counter. We do this by retrieving the current
-                    # resource count of the selected property from the counter struct, deducting the value of the
-                    # selected resource and then setting the counter in the struct to the new result.
-                    setattr(counter, res_select[i].get(),
-                            getattr(counter, res_select[i].get())-int(getattr(res.stack[i], res_select[i].get())))
-                    # Push the resource to the assignment stack.
-                    res.give_selected_card(assignment.tier1_stack, i)
-
-                    # Check whether the the assignment requirements are fulfulled. If so, we're done.
-                    if (counter.earth <= 0 and counter.wood <= 0 and
-                            counter.stone <= 0 and counter.metal <= 0 and counter.fuel <= 0):
-                        assignment.tier1_fulfilled = '1'
-                        self.visualiser.log('Tier 1 assignment fulfulled')
-                        break
-
-            # Decrease the counter for the next iteration.
-            i -= 1
-
-        # Safety measure: if we looped over all selected resources and the assigmnent is not fulfulled, push all
-        # resources back to the home stack. This should never happen since the fulfull button is only enabled after
-        # checking whether the selection fulfulls the assignment.
-        if assignment.tier1_fulfilled == '0':
-            self.visualiser.log('Tier 1 assignment not fulfilled, returning resources to home stack.')
-            # Loop over all resource cards in the assignment stack and give them to the home town stack.
-            while len(assignment.tier1_stack.stack) > 0:
-                assignment.tier1_stack.give_card(res)
+        # Retrieve the resource values of the cards and the resource selected for each card.
+        [values, collect] = res.get_value_matrix()
+        selection = self.get_selection(res_select)
+        requirement = self.get_tier1_requirement(assignment)
+
+        # Cards are passed from the back of the stack to the front, and a card is passed only while the requirement for
+        # its selected resource is not yet met. So a card is passed when the cards behind it with the same selected
+        # resource add up to less than the requirement. This is computed for all cards at once with a cumulative sum
+        # per resource, from back to front, which excludes the card itself.
+        used = (selection[:, None] == numpy.arange(len(card_types.resources))) * values[:len(selection)]
+        behind = numpy.cumsum(used[::-1], axis=0)[::-1] - used
+        selected = (selection >= 0) & (selection < len(card_types.resources))
+        passed = numpy.zeros(len(selection), dtype=bool)
+        passed[selected] = behind[selected, selection[selected]] < requirement[selection[selected]]
+
+        # Only pass the cards if they fulfill the assignment. This should always be the case since the fulfill button
+        # is only enabled after checking whether the selection fulfills the assignment.
+        if assignment.tier1_fulfilled == 0 and numpy.all(used[passed].sum(axis=0) >= requirement):
+            # Loop backwards over the passed cards, that way we don't get indexing problems when we pop a resource.
+            for i in numpy.flatnonzero(passed)[::-1]:
+                res.give_selected_card(assignment.tier1_stack, int(i))
+            assignment.tier1_fulfilled = 1
+            log.info('Tier 1 assignment fulfulled')
+        else:
+            log.info('Tier 1 assignment not fulfilled, the resources stay in the home stack.')
         # Close the resource window, it is not up-to-date anymore and pressing the fulfill button again would
         # cause problems.
         window.destroy()
@@ -558,23 +633,19 @@ class Game:
     
         """
         # Log message to announcing what we're about to do.
-        self.visualiser.log('Attempting to fulfull tier 2 assigment...')
+        log.info('Attempting to fulfull tier 2 assigment...')
         # Get a short reference to the resource stack
         res = self.grid.objects[index].resources
-        # Loop over the selected resources and remove them from the stack if it is the right type of special resource.
-        # These resources are transferred to the assignment tier2 stack.
-        # We will loop backwards, that way we don't get indexing problems when we pop a resource.
-        i = res.get_size() - 1
-        while i >= 0:
-            # Check whether the resource is selected and whether the selection is the special for the assignment.
-            if res_select[i].get() != 'none' and assignment.tier2.find(res_select[i].get()):
-                # If so, transfer the resource to the assignment stack and remove the corresponding variable from
-                # the res_select list.
-                res.give_selected_card(assignment.tier2_stack, i)
-                res_select.pop(i)
-
-            # Decrease the counter for the next iteration
-            i -= 1
+        # Find the cards which are selected as collectible and are the special for the assignment.
+        [values, collect] = res.get_value_matrix()
+        selection = self.get_selection(res_select)
+        passed = (selection == len(card_types.resources)) & self.get_tier2_mask(assignment)[collect[:len(selection)]]
+        # Transfer these resources to the assignment tier2 stack and remove the corresponding variables from the
+        # res_select list. We loop backwards, that way we don't get indexing problems when we pop a resource.
+        for i in numpy.flatnonzero(passed)[::-1]:
+            res.give_selected_card(assignment.tier2_stack, int(i))
+            res_select.pop(i)
+
         # Update the player scores
         self.update_points()
         # Close the resource window, it is not up-to-date anymore.
@@ -596,7 +667,7 @@ class Game:
                     n_empty_stacks += 1
             # If the the number of empty stacks is 2 or more, initiate the end-of-game phase.
             if n_empty_stacks >= 2:
-                self.visualiser.log('Two or more resource stacks are empty. Each player gets one more turn.')
+                log.info('Two or more resource stacks are empty. Each player gets one more turn.')
                 # self.end_cycle = True
                 # Each player gets one more turn till game end
                 self.turns_till_end = self.n_players
@@ -614,141 +685,49 @@ class Game:
         else:
             return False
 
-    def gen_res_conf(self, res_count, cards):
-        """Generates the resource config files of each landscape type. 
-        
-        Each landscape has it's own associated resource as follows: 
-        Sand: earth, forest: wood, meadow: stone, rock: metal, swamp: fuel.
-        Each terrain type stack contains 6/10 specials of it's own resource type and 1 of each of the other four.
-        Each terrain type stack contains the 3-valued cards of its own resource type, the rest is distributed evenly.
-        
-        Arguments:
-            - res_count: number of cards of each type to generate
-            - cards: name of the cards corresponding to res_count.
-        
-        """
-        self.visualiser.log('Creating landscape drawpiles...')
-        # Put all terrain-specific variables in a struct so we can use getattr to loop over terrain types.
-        # Create empty object to do store the terrain-specific variables.
-
-        def terr(): return 0
-
-        # Lists of terrain types and associated resources. The specials are not in this list and are handled separately.
-        terrains = ['sand', 'forest', 'meadow', 'rock', 'swamp']
-        resources = ['earth', 'wood', 'stone', 'metal', 'fuel']
-
-        # Loop over terrain types.
-        for i in terrains:
-            # Initialize a new config structure
-            this_config = configparser.ConfigParser()
-            # Load all resource tiles except the specials.
-            this_config.read([self.config.get('Game', 'resources'), self.config.get('Game', 'specials')])
-            # Add the config for this terrain to the terr object. NB: all five configs are the same for now
-            setattr(terr, i+'_conf', this_config)
-
-        # Loop over the resource cards and distribute the number in res_count over the resource piles.
-        for i in range(0, len(cards)):
-            # Retrieve the values for the next card in the stack:
-            # Name of the card (equal to key in the config object).
-            this_card = cards[i]
-            # Number of copies of the card to distribute.
-            this_number = int(res_count[i][0])
+    def get_current_player(self):
+        """ Returns the label of the currently active player. """
 
-            self.visualiser.log('Distributing ' + str(this_number) + ' copies of resource card ' + this_card)
+        return getattr(self, self.current_player)
 
-            # Flag to indicate whether we ran into a 3-valued card. If not, it needs to be distributed later.
-            isthree = False
-            # Loop over terrains and distribute the current resource card count.
-            for j, k in zip(resources, terrains):
-                # Extract the resource values of the current card. I use the sand config here, but could be any of
-                # the five, since they're all identical before processing.
-                setattr(terr, 'this_' + j, terr.sand_conf.get(this_card, j))
-                # In case of a 3-valued resource, set the card copies to 0 as default if the landscape type is not the
-                # default, else set it to 3.
-                if getattr(terr, 'this_' + j) == '3':
-                    getattr(terr, k + '_conf').set(this_card, 'copies', str(this_number))
-                    self.visualiser.log('    ...adding ' + str(this_number) + ' copies to ' + k)
-                    isthree = True
-                # If the resource card does not have a resource value of three for the preferred resource, set the card
-                # count to 0. Part of these are overwritten in the next code block.
-                else:
-                    getattr(terr, k + '_conf').set(this_card, 'copies', str(0))
+    def get_selection(self, res_select):
+        """Converts the resource selection of the assignment popup to an array with for each card the column of the
+        selected resource in the value matrix of the stack, see get_selection_column.
 
-            # We divide the other cards by five and distribute evenly. The round-off error is handled by giving
-            # sand, forest, meadow and swamp rounded 1/5 of the cards, and substracting the rounded from the total to
-            # get the number for rock. This corrects for the fact that rock is a bit underpopulated since metal is
-            # relatively rare in the game.
-            # Do this for any card that is not a three for the current landscape.
-            if not isthree:
-                # Calculate the card count for all stacks except rock.
-                fraction = math.floor(this_number/5)
-                # Calculate the number for the rock stack.
-                rest = this_number - 4*fraction
-                # Put numbers for all five terrain types in one list.
-                distribute = [fraction, fraction, fraction, rest, fraction]
-                # Loop over the five terrain types and set the card counts as in distribute.
-                for j, k in zip(terrains, distribute):
-                    getattr(terr, j+'_conf').set(this_card, 'copies', str(k))
-                    self.visualiser.log('    ...adding ' + str(k) + ' copies to ' + j)
+        """
+        return numpy.array([self.get_selection_column(variable.get()) for variable in res_select], dtype=int)
 
-        # Next, we handle the special cards. Retrieve specials only and shuffle.
-        temp_cards = DrawPile(self.config.get('Game', 'specials'), 'temp')
-        # Create counters for the number of each special type already assigned.
-        for i in resources:
-            setattr(terr, i+'_counter', 0)
-            # Make a distribution list for each special type. The randimization is handled by the shuffling of the
-            # DrawPile above.
-            # Retrieve the dominant terrain for the current special resource type.
-            dominant_terrain = terrains[resources.index(i)]
-            # The dominant terrain for the special type is repeated 5x, the sixth is already in terrains.
-            setattr(terr, i+'_dist', [dominant_terrain]*5 + terrains)
+    def get_selection_column(self, selected):
+        """Returns the column in the value matrix of a stack for the resource selected for a card: 0 to 4 for ewsmf, 5
+        for a collectible and -1 if the card is not used.
 
-        # Loop over the specials and the set the card counts for each landscape, ie to 1 or 0 depending on how many of
-        # the same collectible were already encountered. This is managed by counting how many of the same type of
-        # collectible were already encountered and using this counter to index the terr.i+dist list declared above.
-        for i in range(0, temp_cards.get_size()):
-            # Pop the topmost card from the collectibles stack.
-            this_card = temp_cards.lose_card()
-            # Retrieve the corresponding landscape by finding the index of the collectible type in the resource list.
-            this_res = [j for j in resources if this_card.collect[0:4] in j]
-            # Assign the card to the landscape pile indicated by the counter for the special type. (Yes, this is a bit
-            # convoluted, alternative is 10 km of spaghetti).
-            # Retrieve the terrain type
-            this_terrain = getattr(terr, this_res[0] + '_dist')[getattr(terr, this_res[0] + '_counter')]
+        """
+        columns = card_types.resources + ['collect']
+        if selected in columns:
+            return columns.index(selected)
+        return -1
 
-            # Set the card counts for all terrain types to 0 except for this_terrain which is 1.
-            for k in terrains:
-                if k == this_terrain:
-                    getattr(terr, k+'_conf').set(this_card.name, 'copies', '1')
-                    self.visualiser.log('Assigning 1 copy of ' + this_card.name + ' to ' + k)
-                else:
-                    getattr(terr, k + '_conf').set(this_card.name, 'copies', '0')
-            # Increase the counter for the current collectible type.
-            setattr(terr, this_res[0] + '_counter', getattr(terr, this_res[0] + '_counter') + 1)
-
-        # Write the five config files.
-        with open(self.config.get('Game', 'sand_resources'), 'w') as configfile:
-            terr.sand_conf.write(configfile)
-        with open(self.config.get('Game', 'forest_resources'), 'w') as configfile:
-            terr.forest_conf.write(configfile)
-        with open(self.config.get('Game', 'meadow_resources'), 'w') as configfile:
-            terr.meadow_conf.write(configfile)
-        with open(self.config.get('Game', 'rock_resources'), 'w') as configfile:
-            terr.rock_conf.write(configfile)
-        with open(self.config.get('Game', 'swamp_resources'), 'w') as configfile:
-            terr.swamp_conf.write(configfile)
+    def get_tier1_requirement(self, assignment):
+        """Returns the tier1 resource requirement of an assignment as an array (ewsmf)."""
+        return numpy.array([getattr(assignment, 'tier1_req_' + resource) for resource in card_types.resources])
 
-    def get_current_player(self):
-        """ Returns the label of the currently active player. """
+    def get_tier2_mask(self, assignment):
+        """Returns a boolean array which tells for each collect id whether the collectible counts for the tier2
+        objective of the assignment.
 
-        return getattr(self, self.current_player)
+        """
+        ids = card_types.get_collect_ids(assignment.tier2)   # May register collectibles which are not in the card files
+        mask = numpy.zeros(len(card_types.collect_ids), dtype=bool)
+        mask[ids] = True
+        mask[0] = False     # Cards which are not collectibles never count
+        return mask
 
     def get_required_resources(self):
         """ Adds up the resource requirement of the all player assignments and applies the multiplier specified in the 
         game confige file.
         
         """
-        self.visualiser.log('Calculating resource requirement...')
+        log.info('Calculating resource requirement...')
         # Initialize vectors to store the results (in the order ewsmf).
         req = numpy.array([0, 0, 0, 0, 0])
         req.shape = (5, 1)
@@ -758,18 +737,17 @@ class Game:
             # Retrieve an easy reference to the player assignment.
             ass = getattr(self, 'player' + str(player + 1)).assignment
             # Write a log message about the assignment.
-            self.visualiser.log('player' + str(player + 1) + ' assignment requires (ewsmf) = ' + ass.tier1_req_earth
-                                + ' ' + ass.tier1_req_wood + ' ' + ass.tier1_req_stone + ' ' + ass.tier1_req_metal
-                                + ' ' + ass.tier1_req_fuel)
+            log.info('player%s assignment requires (ewsmf) = %s %s %s %s %s',
+                     player + 1, ass.tier1_req_earth, ass.tier1_req_wood, ass.tier1_req_stone, ass.tier1_req_metal,
+                     ass.tier1_req_fuel)
             # Add the resource requirement of the assignment to the total.
-            req[0] += int(ass.tier1_req_earth)
-            req[1] += int(ass.tier1_req_wood)
-            req[2] += int(ass.tier1_req_stone)
-            req[3] += int(ass.tier1_req_metal)
-            req[4] += int(ass.tier1_req_fuel)
+            req[0] += ass.tier1_req_earth
+            req[1] += ass.tier1_req_wood
+            req[2] += ass.tier1_req_stone
+            req[3] += ass.tier1_req_metal
+            req[4] += ass.tier1_req_fuel
         # Log the total requirement.
-        self.visualiser.log('Total resource requirement (ewsmf) =  ' + str(req[0]) + ' ' + str(req[1]) + ' '
-                            + str(req[2]) + ' ' + str(req[3]) + ' ' + str(req[4]))
+        log.info('Total resource requirement (ewsmf) =  %s %s %s %s %s', req[0], req[1], req[2], req[3], req[4])
         return req
 
     def get_resource_matrix(self):
@@ -803,27 +781,20 @@ class Game:
                 # Add the card's name to the card_names list.
                 card_names.append(this_card.name)
                 # Add the card's resource counts tot the res_mat matrix.
-                res_mat[index, :] = [int(this_card.earth),
-                                     int(this_card.wood),
-                                     int(this_card.stone),
-                                     int(this_card.metal),
-                                     int(this_card.fuel)]
+                res_mat[index, :] = [this_card.earth,
+                                     this_card.wood,
+                                     this_card.stone,
+                                     this_card.metal,
+                                     this_card.fuel]
             index += 1
 
         return [card_names, numpy.transpose(res_mat)]
 
     def quit(self):
-        """Cleans up the generated config files and kills the program."""
+        """Kills the program."""
 
         # Tell people that there are no winners since the game ends prematurely.
-        self.visualiser.log('Game is unfinished so no one wins and no one loses.')
-        # Remove the temp config files.
-        os.remove(self.config.get('Game', 'sand_resources'))
-        os.remove(self.config.get('Game', 'swamp_resources'))
-        os.remove(self.config.get('Game', 'rock_resources'))
-        os.remove(self.config.get('Game', 'forest_resources'))
-        os.remove(self.config.get('Game', 'meadow_resources'))
-        os.remove(self.config.get('Grid', 'tile_temp'))
+        log.info('Game is unfinished so no one wins and no one loses.')
         # Tell the visualiser object to terminate.
         self.visualiser.kill(self.update_points())
 
@@ -874,7 +845,7 @@ class Game:
             else:
                 score_string += i + ': ' + str(player.points) + ' points.\n'
         # Show the score string in the log.
-        self.visualiser.log(score_string)
+        log.info('%s', score_string)
         # Send the string with socres to the visualiser.
         self.visualiser.update_scores()
 
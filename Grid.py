@@ -1,94 +1,144 @@
-import csv
-import configparser
-
 import numpy
 
-from Cards import DrawPile
+import Board
+from Cache import Cache
+from Cards import card_types
 from Hexgrid import Hexgrid
+import Log
+from Mapanalyser import label_components
+from Pawn import Kind
+from Registry import PieceRegistry
+from Terrain import terrain_types
+
+log = Log.get_logger('grid')
 
 class Grid(Hexgrid):
-    def __init__(self,size_x,size_y, visualiser):
-        super().__init__(size_x,size_y)     # Run the hexgrid constructor
+    def __init__(self,size_x,size_y, visualiser, neighbours=None):
+        super().__init__(size_x,size_y,neighbours=neighbours)     # Run the hexgrid constructor
         self.visualiser = visualiser        # Set a link with the visualiser, safes a lot of parameter passing
+        self.pieces = PieceRegistry()       # Index of the pieces on the board by player, kind and location
+        self.occupancy_version = 0          # Increased whenever a piece is placed on or removed from the board
+        self.reachable_cache = Cache('reachable', 1024*1024)  # Memo of the hexes reachable for a piece, see get_reachable
+        self.distance_fields = {}           # (town hex, terrain) -> distance field, see build_distance_fields
+        self.island_labels = (-1, None)     # Terrain version and island of each hex, see get_island_labels
+
+        ''' Table of click handlers, keyed on (kind of the selected object, kind of the object on the clicked hex). None
+        stands for no selection or an empty hex. '''
+        self.click_handlers = {}
+        for selected_kind in [None, Kind.PAWN, Kind.BOAT, Kind.HARBOUR, Kind.HOME]:
+            self.click_handlers[(selected_kind, None)] = self.click_nothing
+            self.click_handlers[(selected_kind, Kind.PAWN)] = self.click_pawn
+            self.click_handlers[(selected_kind, Kind.BOAT)] = self.click_boat
+            self.click_handlers[(selected_kind, Kind.HARBOUR)] = self.click_town
+            self.click_handlers[(selected_kind, Kind.HOME)] = self.click_town
+        self.click_handlers[(Kind.PAWN, None)] = self.click_move
+        self.click_handlers[(Kind.BOAT, None)] = self.click_move
+        self.click_handlers[(Kind.PAWN, Kind.BOAT)] = self.click_board
 
     def activate_hex(self,index):
-        ''' Spaghetti which handles the events when a player clicks a hex '''
+        ''' Handles the events when a player clicks a hex. The action depends on the kind of the selected object and the
+        kind of the object on the clicked hex, the handler is looked up in self.click_handlers. '''
 
         self.visualiser.remove_selected_items() # Remove all highlighted items and option icons from the board.
 
-        if self.selected == [] and not self.objects[index]:
-            ''' Do nothing'''
-            self.visualiser.log('Nothing here to do on hex ' + str(index))
-
-        elif self.selected == index and self.dig and 'team' in self.objects[index].label and self.get_landscape_stack_size_by_index(index) > 0:
-            ''' If a pawn is selected and the clicked index is the selected index and the drawpile for the landscape is not empty, check whether the "dig" option was clicked.'''
-            self.visualiser.log('Digging...')
+        if self.selected != [] and self.objects[self.selected]:
+            selected_kind = self.objects[self.selected].kind
+        else:
+            selected_kind = None
+        if self.objects[index]:
+            target_kind = self.objects[index].kind
+        else:
+            target_kind = None
+        self.click_handlers[(selected_kind, target_kind)](index)
+
+    def build_distance_fields(self):
+        ''' Computes the land and water distance fields of every harbour and home on the board. A field holds for every
+        hex the number of steps to the town, so questions like how far a boat is from its home are a single array read.
+        The fields are kept up to date by set_tile and set_terrain_masks. Called once the towns are placed. '''
+        self.distance_fields = {}
+        for kind in [Kind.HARBOUR, Kind.HOME]:
+            for town in self.pieces.get_pieces_by_kind(kind):
+                index = self.pieces.get_hex(town)
+                for terrain in ['land', 'water']:
+                    self.distance_fields[(index, terrain)] = self.get_distance_field(index, terrain + '_conn')
+
+    def click_board(self, index):
+        ''' A pawn is selected and the clicked index contains a boat. If the boat belongs to the active player and is
+        reachable, move the selected pawn into the boat. '''
+        if self.objects[index].owner != self.game.current_player:
+            self.click_select(index)
+        elif index in self.get_reachable_boats(self.selected):
+            ''' Move the pawn into the boat'''
+            self.visualiser.message(self.game.current_player + ' moves pawn ' + self.objects[self.selected].label + ' into boat' + self.objects[index].label)
+            not_removed =  self.objects[index].occupy(self.objects[self.selected])
+            if not not_removed:
+                moved_pawn_index = self.selected
+                self.deselect_object()
+                self.remove_object(moved_pawn_index)
+            else:
+                self.select_object(self.selected)
+        else:
+            log.info('Boat %s too far removed from pawn %s',
+                     self.objects[index].label, self.objects[self.selected].label)
+            self.select_object(self.selected)
+
+    def click_boat(self, index):
+        ''' The clicked index contains a boat while no pawn is selected. The boat of the active player gets selected. '''
+        if self.objects[index].owner == self.game.current_player:
+            self.deselect_object()
+            self.select_object(index)
+        else:
+            self.click_select(index)
+
+    def click_move(self, index):
+        ''' A pawn or boat is selected and no object is in the clicked hex. If a boat is selected which has a pawn, we see
+        if the pawn can disembark. Otherwise we attempt to move the selected pawn/boat. '''
+        if self.objects[self.selected].kind == Kind.BOAT and self.objects[self.selected].occupying_pawn:
+            if index in(self.get_reachable_land(self.selected)):  # Disembark the occupying pawn to the index hex
+                self.place_object(self.objects[self.selected].unboard(),index) # The boat object is retrieved, the pawn is unboarded which returns the pawn object
+
+        log.info('Attempt to move pawn to %s', index)
+        if index in self.select_reachable_set:
+            self.move_object(index)
+            self.visualiser.remove_selected_items()
+            self.selected = []
+        else:
+            '''deselect pawn'''
+            self.deselect_object()
+            log.info('Cannot move object to hex %s', index)
+
+    def click_nothing(self, index):
+        ''' Do nothing'''
+        log.info('Nothing here to do on hex %s', index)
+
+    def click_pawn(self, index):
+        ''' If a pawn is selected and the clicked index is the selected index and the drawpile for the landscape is not
+        empty, check whether the "dig" option was clicked. Otherwise the clicked pawn gets selected. '''
+        if self.selected == index and self.dig and self.get_landscape_stack_size_by_index(index) > 0:
+            log.info('Digging...')
             '''The drawpile of the tile type gives a resource to the stash of the activeplayer'''
-            getattr(self.game,self.tiles[index]+'_drawpile').give_card(getattr(self.game,self.game.player_order[self.game.player_index] + 'harbour').resources) # Get a card from the appropriate stack and move it to the player's harbour
+            getattr(self.game,self.get_tile(index)+'_drawpile').give_card(getattr(self.game,self.game.player_order[self.game.player_index] + 'harbour').resources) # Get a card from the appropriate stack and move it to the player's harbour
             self.objects[self.selected].use_moves(1)          # Deduct one move for the pawn
             self.deselect_object()                          # Deselect the hex
             self.game.update_card_counts()                  # Update the card counts
-            self.visualiser.message(self.game.player_order[self.game.player_index] + ' gains ' + getattr(self.game,self.game.player_order[self.game.player_index] + 'harbour').resources.stack[-1].name)
-
-        elif self.selected and not self.objects[index]:
-            ''' If a boat is selected which has a pawn, we see if the pawn can disembark. If the index hex contains an enemy ship, we try to steal from it.'''
-            if 'boat' in self.objects[self.selected].label:
-                if self.objects[self.selected].occupying_pawn:
-                    if index in(self.get_reachable_land(self.selected)):  # Disembark the occupying pawn to the index hex
-                        self.place_object(self.objects[self.selected].unboard(),index) # The boat object is retrieved, the pawn is unboarded which returns the pawn label, which is in turn used to get the pawn object
-
-            if 'team' in self.objects[self.selected].label or 'boat' in self.objects[self.selected].label:
-                ''' If a pawn/boat is selected and no object is in the clicked hex, we attempt to move the selected pawn. '''
-                try:
-                    self.visualiser.log('Attempt to move pawn to ' + str(index))
-                    found = self.select_reachable.tolist().index(index) #This is just a trick to generate an exception if index is empty
-                    self.move_object(index)
-                    self.visualiser.remove_selected_items()
-                    self.selected = []
-
-                except ValueError:
-                    '''deselect pawn'''
-                    self.deselect_object()
-                    self.visualiser.log('Cannot move object to hex ' + str(index))
-
-
-        elif self.selected and 'boat' in self.objects[index].label and self.game.current_player in self.objects[index].label:
-            ''' If a pawn is selected and the clicked index contains a boat, check whether the boat is 1. reachable and
-            2. belongs the the active player. If so, move the selected pawn into the boat. '''
-            if 'team' in self.objects[self.selected].label:
-                if index in self.get_reachable_boats(self.selected):
-                    ''' Move the pawn into the boat'''
-                    self.visualiser.message(self.game.current_player + ' moves pawn ' + self.objects[self.selected].label + ' into boat' + self.objects[index].label)
-                    not_removed =  self.objects[index].occupy(self.objects[self.selected])
-                    if not not_removed:
-                        moved_pawn_index = self.selected
-                        self.deselect_object()
-                        self.remove_object(moved_pawn_index)
-                    else:
-                        self.select_object(self.selected)
-                else:
-                    self.visualiser.log('Boat ' + self.objects[index].label + ' too far removed from pawn ' + self.objects[self.selected].label)
-                    self.select_object(self.selected)
-            else: # The previously selected object wasn't a pawn, so just activate the boat
-                self.deselect_object()
-                self.select_object(index)
-
-        elif 'harbour' in self.objects[index].label or 'home' in self.objects[index].label:
-            '''Display the resources stored by the owner of the harbour'''
-            if self.selected:
-                self.deselect_object()
+            self.visualiser.message(self.game.player_order[self.game.player_index] + ' gains ' + getattr(self.game,self.game.player_order[self.game.player_index] + 'harbour').resources.get_card(-1).name)
+        else:
+            self.click_select(index)
+
+    def click_select(self, index):
+        '''If an object is found on the hex AND it belongs to the active player, select it. '''
+        log.info('Activating %s found on hex %s', self.objects[index].label, index)
+        ''' If an object is already selected, then deselect that before selecting the new one '''
+        self.deselect_object()
+        if self.objects[index].owner == self.game.current_player:
             self.select_object(index)
-
-            '''If an object is found on the hex AND it belongs to the active player, select it. '''
         else:
-            self.visualiser.log('Activating ' + self.objects[index].label + ' found on hex ' + str(index))
-            ''' If an object is already selected, then deselect that before selecting the new one '''
-            if self.selected:
-                self.deselect_object()
-            if self.objects[index].owner == self.game.current_player:
-                self.select_object(index)
-            else:
-                self.select_enemy_object(index)
+            self.select_enemy_object(index)
+
+    def click_town(self, index):
+        '''Display the resources stored by the owner of the harbour or home town'''
+        self.deselect_object()
+        self.select_object(index)
 
     def deselect_object(self):
         if self.selected == []: # Escape the method if nothing is selected
@@ -102,199 +152,346 @@ class Grid(Hexgrid):
             self.visualiser.draw_object(self.selected,self.objects[self.selected])
         ''' Clear the index of the currently selected hex '''
         self.selected = []
-        self.selected_reachable = []
+        self.select_reachable = numpy.array([])
+        self.select_reachable_set = frozenset()
 
     def get_reachable_object_indices(self, terrain, index, radius):
         ''' Returns a list of objects which are within a certain distance, taking into account terrain type (all, land,
         water), from index. '''
 
-        conn_1 = self.get_connections([index], terrain + '_conn', radius)
+        if terrain == 'all':    # Without terrain restrictions the hexes in range follow directly from the coordinates
+            conn_1 = [x for x in self.get_hexes_in_range(index, radius) if x != index]
+        else:
+            conn_1 = self.get_connections([index], terrain + '_conn', radius)
         return  [x for i, x in enumerate(conn_1) if self.objects[x]]
 
+    def get_nearest_town(self, index, terrain, owner=None, kinds=(Kind.HARBOUR, Kind.HOME)):
+        ''' Returns the hex of the harbour or home nearest to hex index over terrain, and the number of steps to it.
+        The towns can be limited to those of one owner and to some kinds. Returns -1, -1 if no such town can be
+        reached. '''
+        nearest = (-1, -1)
+        for ((town, field_terrain), field) in self.distance_fields.items():
+            if field_terrain != terrain or self.objects[town].kind not in kinds:
+                continue
+            if owner is not None and self.objects[town].owner != owner:
+                continue
+            if field[index] != 65535 and (nearest[0] == -1 or field[index] < nearest[1]):
+                nearest = (town, int(field[index]))
+        return nearest
+
+    def get_town_distance(self, town, index, terrain):
+        ''' Returns the number of steps over terrain between the harbour or home at hex town and hex index, or -1 if it
+        cannot be reached. '''
+        distance = self.distance_fields[(town, terrain)][index]
+        if distance == 65535:
+            return -1
+        return int(distance)
+
+    def get_free_hexes(self, index_list):
+        ''' Returns the hexes in index_list which do not contain an object.'''
+        index_list = numpy.array(index_list, dtype=int)
+        return index_list[~self.occupied[index_list]]
+
+    def get_island_labels(self):
+        ''' Returns the island of each hex as an array of component labels, -1 for hexes which are not land. The labels
+        are computed with union-find (see Mapanalyser.label_components) and kept until the terrain changes. '''
+        (version, labels) = self.island_labels
+        if version != self.connectivity_cache.terrain_version:
+            labels = label_components(self.land_mask, self.neighbours)[0]
+            self.island_labels = (self.connectivity_cache.terrain_version, labels)
+        return labels
+
     def get_landscape_stack_size_by_index(self,index):
         ''' Returns the number of resources still available in the stack of the landscape of hex index.'''
-        return getattr(self.game,self.tiles[index]+'_drawpile').get_size()
+        return getattr(self.game,self.get_tile(index)+'_drawpile').get_size()
+
+    def get_reachable(self, index, pawn):
+        ''' Returns the hexes reachable for the pawn at index as an array and as a set. Both are memoized on everything
+        the result depends on: the location, terrain, moves and ring of the pawn, its owner (for the docking hexes next
+        to its towns), and the versions of the occupancy and the terrain. Selecting a piece again when nothing changed,
+        such as after picking another fuel card and back, is then a lookup. '''
+        key = (index, pawn.terrain, pawn.moves, pawn.ring, pawn.owner, self.occupancy_version,
+               self.connectivity_cache.terrain_version)
+        reachable = self.reachable_cache.get(key)
+        if reachable is None:
+            hexes = self.get_reachable_hexes(index, pawn)
+            hexes.flags.writeable = False   # The array is shared with every later caller
+            reachable = (hexes, frozenset(hexes.tolist()))
+            self.reachable_cache.put(key, reachable, hexes.nbytes + 64 * len(hexes))
+        return reachable
 
     def get_reachable_boats(self,index):
         ''' Returns a list of indices for hexes containing a boardable boat for a pawn located at index.'''
-        pawn_moves = self.objects[index].moves
-        # 1. Retrieve reachable land hexes. There needs to be one move left to hop to the ship, so I need to get the
-        # reachables for moves-1.
-        if pawn_moves == 0:
-            return numpy.array([])      # If the pawn has no moves, then nothing is returned
-        else:
-            if pawn_moves == 1:
-                reachable_land = numpy.array(index) # In case move is already 1, I only select the Index of the pawn otherwise I get a crash.
-            else:
-                reachable_land = numpy.append(self.get_connections([index], 'land_conn', pawn_moves-1),index)
-            # 2. Retrieve all tiles which are 1 step removed from the reachable hexes
-            water_1 = self.get_connections(numpy.append(reachable_land,index), 'all_conn',1)
-            # 3. Retrieve all tiles which are within moveable distance for the pawn, regardless of terrain type
-            reachable_all = self.get_connections([index], 'all_conn', pawn_moves)
-            # 4. Select indexes which are the overlap of 2 and 3. The result includes some land tiles, but since these won't have any boats it's not a problem.
-            next_to_land = numpy.intersect1d(water_1, reachable_all)
-            # Now iterate over the resulting tiles to find boats belonging to the player and which are unoccupied
-            reachable_boats = []
-            for i in next_to_land:
-                if self.objects[i]: # Check if there is an object on the tile
-                    if self.objects[i].owner == self.game.current_player and 'boat' in self.objects[i].label: # check if the object is a boat and if it belongs to the active player
-                        if not self.objects[i].occupying_pawn: # Need to put this condition separate since non-boat objects don't have this field
-                            reachable_boats.append(i)
-            return reachable_boats
-
-    def get_reachable_hexes(self,index,pawn):
-        '''Returns a list of all hexes that are reachable for the pawn.'''
-        
-        ''' Retrieve the hexes which are within reach. The connectivity matrix depends on the tile type (i.e. land for
-        pawns, water for boats). If the ring parameter of the object is set to 0, the whole surface within reach of 
-        pawn.moves can be reached. If ring is any positive integer value, a ring of reachable hexes is generated. This 
-        is the case for boats. '''
-        if pawn.moves > 0 and pawn.ring < 1:                                                    # All hexis within pawn.moves distance can be reached.
-             conn = self.get_connections([index],pawn.terrain + '_conn', pawn.moves)
-        elif pawn.moves > 0 and pawn.ring > 0:                                                  # Only a ring of hexes can be reached
-            outer = self.get_connections([index],pawn.terrain + '_conn', pawn.moves)            # Get all water tiles in range
-            inner = self.get_connections([index],pawn.terrain + '_conn', pawn.moves-pawn.ring)  # Get all water tiles in range minus 1
-            conn = numpy.setdiff1d(outer, inner)                                                # The reachable ring is in the outer list but not in the inner list.
+        pawn = self.objects[index]
+        if pawn.moves == 0:
+            return []      # If the pawn has no moves, then nothing is returned
+        (land, boats) = self.get_transfer_targets(index, pawn.moves, pawn.owner, False)
+        return boats.tolist()
+
+    def get_reachable_batch(self, sources):
+        ''' Returns the hexes reachable for many pieces at once, e.g. all pawns and boats of a player. sources is a list
+        of (hex index, piece) pairs; the result is a list with an array of reachable hexes for each of them, in the same
+        order. Pieces which share a terrain and number of moves are searched together in one vectorized pass. Nothing is
+        selected, drawn or changed on the board. '''
+        reachable = [numpy.array([], dtype=int)] * len(sources)
+        groups = {}
+        for (i, (index, piece)) in enumerate(sources):
+            if piece.moves > 0:
+                groups.setdefault((piece.terrain, piece.moves), []).append(i)
+        for ((terrain, moves), members) in groups.items():
+            searches = self.get_distances_batch([sources[i][0] for i in members], terrain + '_conn', moves)
+            for (i, (hexes, distances)) in zip(members, searches):
+                reachable[i] = self.get_reachable_from_distances(hexes, distances, sources[i][1])
+        return reachable
+
+    def get_reachable_from_distances(self, hexes, distances, pawn):
+        ''' Returns the hexes the pawn can move to, given the hexes in reach and the number of steps to each of them.
+        If the ring parameter of the object is set to 0, the whole surface within reach of pawn.moves can be reached. If
+        ring is any positive integer value, a ring of reachable hexes is generated. This is the case for boats. '''
+        in_range = hexes[distances > 0]
+        if pawn.ring < 1:                                                                   # All hexis within pawn.moves distance can be reached.
+            conn = in_range
+        else:                                                                               # Only a ring of hexes can be reached
+            conn = hexes[distances > max(pawn.moves - pawn.ring, 0)]                        # The reachable ring is the part of the range which is more than moves-ring away
 
             ''' We want harbours and towns to be reachable always if they're inside movable range, even if the water/land next to it is
-            not on the reachable ring. For this, we need to add all tiles bordering any harbour/town inside the moveable
-            radius to the list. '''
-            harbours = []                       # List of tiles indices containing a town or harbour
-            ''' Find any player-owned harbour in range + 1. (Harbours bordering the outer ring are already taken care of intrinsically.) '''
-            for i in self.get_connections([index], 'all_conn', pawn.moves+1):           # Loop over the tiles in range
-                if self.objects[i]:             # Is there an object?
-                    if (self.objects[i].label.find('harbour') != -1 or self.objects[i].label.find('home') != -1) and self.objects[i].owner.find(self.game.current_player) != -1:    # Identify player-owned harbours
-                        harbours.append(i)           # Add the index to the list
-
-            next_to_town = numpy.array(self.get_connections(harbours, 'all_conn', 1))   # Find tiles one step removed from each index in the list
-            next_to_town = numpy.intersect1d(next_to_town, outer)                       # Retain indices adjacent to a town/harbour which are within moveable range with the correct landscape type.
+            not on the reachable ring. For this, we need to add all tiles in range bordering any of the owner's harbours/towns to the list. '''
+            towns = [i for i, piece in self.pieces.get_player_pieces(pawn.owner).items() if piece.kind in [Kind.HARBOUR, Kind.HOME]]
+            next_to_town = numpy.intersect1d(self.neighbours[towns].ravel(), in_range)    # Retain indices adjacent to a town/harbour which are within moveable range with the correct landscape type.
             conn = numpy.append(conn, next_to_town)                                     # Add the resulting tiles to conn
 
-        else:
-            conn = [-1]
+        ''' Occupied hexes cannot be reached, so only the unoccupied hexes are returned. '''
+        return self.get_free_hexes(numpy.unique(numpy.array(conn, dtype=int)))
 
-        ''' Identify unoccupied hexes. Occupied hexes cannot be reached. '''
-        empty = [i for i, x in enumerate(self.objects) if not x]
+    def get_reachable_hexes(self,index,pawn):
+        '''Returns a list of all hexes that are reachable for the pawn.'''
 
-        ''' The reachable hexes are the union of the previous two'''
-        return numpy.intersect1d(conn,empty)
+        ''' Retrieve the hexes which are within reach. The connectivity depends on the tile type (i.e. land for
+        pawns, water for boats). A single search gives the distance to every hex in reach, from which both the full
+        surface and the ring follow. '''
+        if pawn.moves > 0:
+            (hexes, distances) = self.get_distances([index], pawn.terrain + '_conn', pawn.moves)
+            return self.get_reachable_from_distances(hexes, distances, pawn)
+        return numpy.array([], dtype=int)
 
     def get_reachable_land(self, index):
         ''' Returns all reachable hexes for a pawn located on a boat. '''
-        pawn_moves = self.objects[index].occupying_pawn.moves
+        pawn = self.objects[index].occupying_pawn
 
-        if pawn_moves == 0: # If the pawn has no moves, it can't go anywhere.
+        if pawn.moves == 0: # If the pawn has no moves, it can't go anywhere.
             return []
+        (land, boats) = self.get_transfer_targets(index, pawn.moves, pawn.owner, True)
 
-        # Get all hexes in a 1-hex diameter
-        all_1 = self.get_connections([index], 'all_conn', 1)
-
-        # Select all land hexes within the 1-hex diameter
-        land_1 = [x for i, x in enumerate(all_1) if self.tiles[x] not in ['water','home']]
-        # If the pawn has more than 1 move, select all hexes which are reachable from the nearby land hexes with moves-1 steps for the pawn on the boat
-        if pawn_moves > 1:
-            pawn_land = self.get_connections(land_1, 'land_conn', pawn_moves - 1)
-            all_reachable_pawn = numpy.append(pawn_land,land_1)
+        # Remove the occupied hexes
+        return self.get_free_hexes(land)
+
+    def get_transfer_targets(self, index, moves, owner, aboard):
+        ''' Searches the states a pawn of owner can get into with the given number of moves. A state is a hex together
+        with whether the pawn is on land or on board of a boat. The pawn starts on land at hex index, or on board of the
+        boat at hex index if aboard is True. Each move is one of these transitions:
+        - walk: from land to a neighbouring land hex,
+        - board: from land to a neighbouring hex with an unoccupied boat of the owner. This ends the pawn's moves,
+        - disembark: from a boat to a neighbouring land hex.
+        Returns two arrays: the land hexes the pawn can get to and the hexes with the boats it can board. '''
+        boardable = numpy.array([i for i, piece in self.pieces.get_player_pieces(owner).items()
+                                 if piece.kind == Kind.BOAT and not piece.occupying_pawn], dtype=int)
+        no_hexes = numpy.array([], dtype=int)
+        if aboard:
+            land_frontier = no_hexes
+            boat_frontier = numpy.array([index])
+        else:
+            land_frontier = numpy.array([index])
+            boat_frontier = no_hexes
+        land_reached = land_frontier
+        boats_reached = no_hexes
+
+        for step in range(moves):
+            from_land = self.neighbours[land_frontier].ravel()
+            from_boat = self.neighbours[boat_frontier].ravel()
+            # Walking and disembarking lead to land hexes which were not reached before
+            to_land = numpy.concatenate([from_land, from_boat])
+            to_land = to_land[to_land >= 0]
+            to_land = numpy.setdiff1d(to_land[self.land_mask[to_land]], land_reached)
+            # Boarding leads to the owner's unoccupied boats next to the land hexes. Boat states are not expanded
+            # further since boarding ends the pawn's moves.
+            boats_reached = numpy.union1d(boats_reached, numpy.intersect1d(from_land, boardable))
+            if len(to_land) == 0:
+                break
+            land_reached = numpy.union1d(land_reached, to_land)
+            land_frontier = to_land
+            boat_frontier = no_hexes
+
+        if not aboard:
+            land_reached = land_reached[land_reached != index]   # The start hex is not a destination
+        return land_reached, boats_reached
+
+    def load_map(self, config, board=None):
+        ''' Creates a game board with player start setup from the board file, or from board if the file was already
+        loaded (see Board.load).'''
+
+        ''' Open de board file. If the tile type is random or land, a random land tile needs to be drawn. Otherwise
+        the tile type specified in the board file is copied. The board itself is never changed, it may be shared, for
+        instance by the asset bundle: the tiles are copied since they are randomized below, and the object columns
+        are copied unless they are memory-mapped, so a mapped board is not read until its objects are needed. '''
+        if board is None:
+            board = Board.load(config.get('Game','board'))
+        if board.n_hexes == self.n_hexes:
+            self.tiles = numpy.array(board.get_tiles())
+            mapped = isinstance(board.kinds, numpy.memmap)
+            self.object_kinds = board.kinds if mapped else numpy.array(board.kinds)      # The player objects will later be processed during init of Game class
+            self.object_owners = board.owners if mapped else numpy.array(board.owners)
         else:
-            all_reachable_pawn = land_1
+            n_tiles = min(board.n_hexes, self.n_hexes)
+            self.tiles[:n_tiles] = board.get_tiles()[:n_tiles]
+            self.object_kinds[:n_tiles] = board.kinds[:n_tiles]
+            self.object_owners[:n_tiles] = board.owners[:n_tiles]
 
-        # Remove the occupied hexes
-        return [x for i, x in enumerate(all_reachable_pawn) if self.objects[x] == '']
-
-    def load_map(self, config):
-        ''' Creates a game board with player start setup from csv file'''
-
-        '''Open de board file. If the tile type is random or land, a random land tile needs to be drawn.
-        Otherwise the tile type specified in the board file is copied.'''
-        with open(config.get('Game','board')) as f:
-            reader = csv.reader(f, delimiter=',')
-            next(reader, 'none')  # skip the header
-            for row, index in zip(reader, range(0, self.n_hexes)):
-                self.tiles[index] = row[1]  # The tile type is specified in row 1 the input file. Randomized tiles are handled below
-                if row[2]:                  # Row 2 contains the locations of the player objects. These will later be processed during init of Game class
-                    self.objects_init[index] = 'init_' + row[3] + '_' + row[2]
-
-            ''' Determine how many of each landscape tile we need for the randomized tiles. There is two types of 
-            random tiles: 1. random (all tile types, including water) and 2. land (random but has to be land). '''
-            # Count the numbmer of random entries
-            # Count the nuber of land entires
-            n_random = self.tiles.count('random') + self.tiles.count('land')                  # Total number of ranomized tiles
-            n_land = numpy.floor(self.tiles.count('random')/6 + self.tiles.count('land')/5)   # Number of land tiles required of each type is random/6 + land/5
-            n_water = n_random - 5*n_land                                                       # Number of water is all that remains
-            this_config = configparser.ConfigParser()                                           # Initialize a new config structure
-            this_config.read(config.get('Grid', 'tile_file'))                                   # Load a template for all tiles (single copy each)
-
-            for type in ['sand','forest','meadow','rock','swamp']:                          # Set the number of copies for each tile type
-                this_config.set(type, 'copies', str(int(n_land)))
-            this_config.set('water', 'copies', str(int(n_water)))
-
-            with open(config.get('Grid', 'tile_temp'), 'w') as configfile:        # Write the result to a temporary ini file
-                this_config.write(configfile)
-
-            self.tile_draw = DrawPile(config.get('Grid', 'tile_temp'), 'tile_drawpile')                  # Create the draw pile for the randomized tiles from the temp file
-
-        ''' Now we loop over the randomized tiles and assign a random tile from the draw pile.
-        NB we need to process the land-only randoms first, otherwise we may run out of land tiles before we get to them.'''
-        for tile, index in zip(self.tiles,self.all_hexes):
-            if tile == 'land':  # randomized land only. If we draw water, we put it back, shuffle, and try again
-                iswater = True
-                iterations = 0
-                while iswater:  # Keep drawing until a non-water tile is drawn
-                    drawn_tile = self.tile_draw.lose_card()
-                    if drawn_tile.name == 'water' and iterations < 2*self.tile_draw.get_size():    # At some point we may need to give up :)
-                        self.tile_draw.receive_card(drawn_tile)
-                        self.tile_draw.shuffle_stack()
-                        iswater = True
-                        iterations += 1
-                    else:
-                        self.tiles[index] = drawn_tile.name
-                        iswater = False
-            elif tile == 'random':  # fully randomized tiles, including water
-                drawn_tile = self.tile_draw.lose_card()
-                self.tiles[index] = drawn_tile.name
-
-        self.set_land_connectivity()        # Set the land connectivity matrix
-        self.set_water_connectivity()       # Set the water connectivity matrix
+        # Replace the randomized tiles. The map is reproducible if a seed is set in the config.
+        seed = config.get('Grid', 'map_seed', fallback='')
+        self.randomize_tiles(config.get('Grid', 'tile_file'), int(seed) if seed else None)
+
+        self.set_terrain_masks()            # Set the terrain masks for the new tiles
 
     def move_object(self, new_index):
         ''' Attempts to move a pawn from the current location to new_index'''
         ''' If everything is going as it should, self.selected and self.select_reachable should already be filled '''
         ''' check if the new_index is reachable, if so do the move'''
-        #if numpy.where(self.select_reachable == new_index):
-        if new_index in self.select_reachable:
+        if new_index in self.select_reachable_set:
             object = self.remove_object(self.selected)
             self.place_object(object,new_index)
             object.moves = 0
             ''' If the moved object is a boat then burn the selected fuel'''
-            if 'boat' in object.label:
+            if object.kind == Kind.BOAT:
                 object.burn_fuel()                                  # Burn selected fuel
-            self.visualiser.log('Pawn ' + object.label + ' moved from hex ' + str(self.selected) + ' to ' + str(new_index))
+            log.info('Pawn %s moved from hex %s to %s', object.label, self.selected, new_index)
             
         else:
-            object = getattr(self.game,self.objects[self.selected])
-            self.visualiser.log('Illegal move for pawn ' + object.label + ' moved from hex ' + str(self.selected) + ' to ' + str(new_index))
+            object = self.objects[self.selected]
+            log.info('Illegal move for pawn %s moved from hex %s to %s', object.label, self.selected, new_index)
 
     def place_object(self, object, index):
         '''Attempts to place a moveable Game piece on the playing board on hex index '''
-        self.visualiser.log('Placing ' + object.label + ' on hex ' + str(index) + '...')
+        log.info('Placing %s on hex %s...', object.label, index)
         # Check whether position x,y is occupied, if so return false.
         if not self.objects[index]:
             self.objects[index] = object
+            self.occupied[index] = True
+            self.occupancy_version += 1
+            self.pieces.add(object, index)
             self.visualiser.draw_object(index, object)
-            self.visualiser.log('    ...success')
+            log.info('    ...success')
             return True
         else:
-            self.visualiser.log('    ...failed: hex already occupied by ' + self.objects[index])
+            log.info('    ...failed: hex already occupied by %s', self.objects[index].label)
             return False
 
+    def plan_route(self, index, goal, pawn, use_fuel=True):
+        ''' Plans a trip for the pawn or boat pawn at hex index to hex goal, spread over as few turns as possible. If
+        goal holds a piece, such as a harbour or home, the trip ends next to it. In the current turn the pawn can go its
+        remaining moves. Every later turn adds its moves per turn; with use_fuel a boat also burns one of its fuel
+        resources per turn, the largest first, as Boat.select_fuel would. Other pieces are not in the way since they
+        can be passed, and they will have moved by then anyway.
+
+        Every stop follows the ring rule of get_reachable_from_distances: a boat ends its turn more than moves - ring
+        steps further, unless it stops next to one of its own towns. Stops are only placed on a shortest route, so if
+        the ring rule allows no split of that route into turns the plan is empty, even where a detour would get there.
+
+        Returns the route as a list of hexes and a list with, for every turn, the position on the route where the pawn
+        ends that turn. Both are empty if the goal cannot be reached. A pawn on land never leaves its island, so a goal
+        on another island is turned down without a search. '''
+        adjacent = self.objects[goal] is not None
+        if pawn.terrain == 'land' and self.land_mask[index]:
+            ends = self.neighbours[goal][self.neighbours[goal] >= 0] if adjacent else [goal]
+            if not any(self.same_island(index, end) for end in ends):
+                return [], []
+        (route, cost) = self.find_path(index, goal, pawn.terrain + '_conn', adjacent)
+        if cost < 0:
+            return [], []
+
+        fuel = []
+        if use_fuel and pawn.kind == Kind.BOAT:
+            fuel = [pawn.resources.get_card(i).fuel for i in range(pawn.resources.get_size()) if i != pawn.selected_fuel]
+            fuel = sorted([f for f in fuel if f > 0], reverse=True)
+        docking = set()
+        if pawn.ring > 0:
+            towns = [i for i, piece in self.pieces.get_player_pieces(pawn.owner).items() if piece.kind in [Kind.HARBOUR, Kind.HOME]]
+            docking = set(self.neighbours[towns].ravel().tolist())
+
+        # Find the positions on the route which can be reached in each turn. A piece may also stay where it is.
+        reached = {0: (None, -1)}       # Position on the route -> (position at the start of the turn, turn number)
+        turn = 0
+        moves = pawn.moves
+        while cost not in reached:
+            new = {}
+            for position in sorted(reached, reverse=True):  # The furthest start first, so each turn goes as far as it can
+                for step in range(1, min(moves, cost - position) + 1):
+                    end = position + step
+                    if end in reached or end in new:
+                        continue
+                    if pawn.ring > 0 and step <= moves - pawn.ring and route[end] not in docking:
+                        continue    # Not on the ring of the boat
+                    new[end] = (position, turn)
+            if not new and turn > 0 and moves == pawn.moves_per_turn and not fuel:
+                return [], []       # Later turns are the same as this one, so the goal is never reached
+            reached.update(new)
+            turn += 1
+            moves = pawn.moves_per_turn
+            if fuel:
+                moves += fuel.pop(0)
+
+        # Walk back from the goal. Between two hops the piece stays where the earlier hop ended.
+        stops = [cost] * turn
+        position = cost
+        while position != 0:
+            (start, hop_turn) = reached[position]
+            stops[:hop_turn] = [start] * hop_turn
+            position = start
+        return route, stops
+
+    def randomize_tiles(self, tile_file, seed=None):
+        ''' Replaces the randomized tiles on the board by tiles from tile_file. There is two types of random tiles:
+        1. random (all tile types, including water) and 2. land (random but has to be land).
+
+        The pile of tiles holds random/6 + land/5 copies of each land type, but at least enough land for all land-only
+        hexes, and water for all that remains. The land-only hexes get a sample of the land tiles of the pile, the
+        random hexes a sample of all remaining tiles, so every land-only hex gets land and the board holds exactly the
+        tiles of the pile. The same seed gives the same map.
+
+        The tiles are written directly and the terrain masks are not updated, load_map recomputes them afterwards. '''
+        rng = numpy.random.RandomState(seed)
+        land_slots = numpy.flatnonzero(self.tiles == terrain_types.get_code('land'))
+        random_slots = numpy.flatnonzero(self.tiles == terrain_types.get_code('random'))
+
+        # Determine how many of each landscape tile we need for the randomized tiles.
+        n_land = max(int(len(random_slots)/6 + len(land_slots)/5), -(-len(land_slots) // 5))
+        n_water = max(len(random_slots) + len(land_slots) - 5*n_land, 0)
+        copies = {'sand': n_land, 'forest': n_land, 'meadow': n_land, 'rock': n_land, 'swamp': n_land,
+                  'water': n_water}
+        codes = []
+        counts = []
+        for (tile, n) in card_types.load(tile_file):   # All tiles, as parsed from the tile file
+            codes.append(terrain_types.get_code(tile.name))
+            counts.append(copies.get(tile.name, n))
+        pile = numpy.repeat(numpy.array(codes, dtype=numpy.uint8), counts)    # The pile of tiles as terrain codes
+        is_land = terrain_types.is_land[pile]
+
+        # Land-only hexes draw from the land tiles, the random hexes from the land tiles which are left and the rest
+        land_pile = rng.permutation(pile[is_land])
+        rest_pile = rng.permutation(numpy.concatenate([land_pile[len(land_slots):], pile[~is_land]]))
+        self.tiles[land_slots] = land_pile[:len(land_slots)]
+        self.tiles[random_slots] = rest_pile[:len(random_slots)]
+
     def remove_object(self,index):
-        if not self.objects:
-            self.visualiser.log('No pawn found on hex ' + str(index))
+        if not self.objects[index]:
+            log.info('No pawn found on hex %s', index)
         else:
             self.visualiser.remove_object(index)
             removed  = self.objects[index]
             self.objects[index] = None
-            self.visualiser.log('Object ' + removed.label + ' removed from hex ' + str(index))
+            self.occupied[index] = False
+            self.occupancy_version += 1
+            self.pieces.remove(removed)
+            log.info('Object %s removed from hex %s', removed.label, index)
             return removed
 
 
@@ -302,30 +499,30 @@ class Grid(Hexgrid):
         ''' shows objects belonging to enemy objects of the board.'''
 
         ''' The rest of the procedure depends on the object type'''
-        if 'team' in self.objects[index].label:
-            self.visualiser.log('No options for enemy pawns')
-        elif 'boat' in self.objects[index].label:
+        if self.objects[index].kind == Kind.PAWN:
+            log.info('No options for enemy pawns')
+        elif self.objects[index].kind == Kind.BOAT:
             '''Draw the highlighted pawn, draw the icons for the boat options (unboarding), display the resource popup and display the fuel burn popup. '''
             self.visualiser.enemy_resources_popup(index)
-        elif 'harbour' in self.objects[index].label or 'home' in self.objects[index].label:
+        elif self.objects[index].kind in [Kind.HARBOUR, Kind.HOME]:
             ''' Draw the harbour and show the resource popup.'''
             self.visualiser.enemy_resources_popup(index)
         else:
-            self.visualiser.log('Unknown object')
+            log.warning('Unknown object')
 
     def select_object(self,index):
         '''Assigns the input index to self.selected and determines all reachable hexes for the selected object. 
         Then tells the visualiser to highlight the hex in which it is located and all reachable hexes'''
 
-        self.visualiser.log('Selecting pawn at hex ' + str(index))
+        log.info('Selecting pawn at hex %s', index)
         ''' Store  the index of the currently selected hex '''
         self.selected = index
 
-        self.visualiser.log('Selecting pawn at hex ' + str(index))
+        log.info('Selecting pawn at hex %s', index)
         ''' Store  the index of the currently selected hex '''
         self.selected = index
         ''' Determine hexes reachable by the pawn in hex index '''
-        self.select_reachable = numpy.array(self.get_reachable_hexes(index, self.objects[index]))
+        (self.select_reachable, self.select_reachable_set) = self.get_reachable(index, self.objects[index])
 
         for i in self.select_reachable:
             self.visualiser.highlight_hex(i, 'pawn')
@@ -336,18 +533,63 @@ class Grid(Hexgrid):
         self.visualiser.highlight_hex(index,'reachable')
 
         ''' The rest of the procedure depends on the object type'''
-        if 'team' in self.objects[index].label:
+        if self.objects[index].kind == Kind.PAWN:
             ''' Draw the highlighted pawn and show the pawn options (digging, boarding a boat) '''
             self.visualiser.draw_object(index,self.objects[index])
             self.visualiser.show_pawn_options(index)
-        elif 'boat' in self.objects[index].label:
+        elif self.objects[index].kind == Kind.BOAT:
             '''Draw the highlighted pawn, draw the icons for the boat options (unboarding), display the resource popup and display the fuel burn popup. '''
             self.visualiser.draw_object(index, self.objects[index])
             self.visualiser.show_boat_options(index)
             self.visualiser.player_resources_popup(index)
-        elif 'harbour' in self.objects[index].label or 'home' in self.objects[index].label:
+        elif self.objects[index].kind in [Kind.HARBOUR, Kind.HOME]:
             ''' Draw the harbour and show the resource popup.'''
             self.visualiser.draw_object(index, self.objects[index])
             self.visualiser.player_resources_popup(index)
         else:
-            self.visualiser.log('Unknown object')
+            log.warning('Unknown object')
+
+    def same_island(self, index_a, index_b):
+        ''' Returns whether hexes index_a and index_b are land hexes of the same island. '''
+        labels = self.get_island_labels()
+        return bool(labels[index_a] >= 0 and labels[index_a] == labels[index_b])
+
+    def set_terrain_masks(self):
+        ''' Recomputes the terrain masks from the tiles and rebuilds the distance fields of the towns. Also called by
+        set_tiles, for instance when grow_land replaces the map. '''
+        super().set_terrain_masks()
+        for (town, terrain) in self.distance_fields:
+            self.distance_fields[(town, terrain)] = self.get_distance_field(town, terrain + '_conn')
+
+    def set_tile(self, index, tile):
+        ''' Sets the tile type of hex index and updates the distance fields of the towns. '''
+        was_in = {'land': self.land_mask[index], 'water': self.water_mask[index]}
+        super().set_tile(index, tile)
+        for (town, terrain) in self.distance_fields:
+            is_in = self.get_terrain_mask(terrain + '_conn')[index]
+            if town == index or is_in == was_in[terrain]:
+                continue
+            if is_in:
+                self.shorten_distance_field(self.distance_fields[(town, terrain)], index, terrain)
+            else:
+                # Distances may grow when a hex drops out of the terrain, that cannot be repaired locally
+                self.distance_fields[(town, terrain)] = self.get_distance_field(town, terrain + '_conn')
+
+    def shorten_distance_field(self, field, index, terrain):
+        ''' Updates field after hex index became part of terrain. Only the hexes which get closer through index are
+        visited: starting from index, each round lowers the distance of the neighbours which are more than one step
+        further away than the current frontier. '''
+        mask = self.get_terrain_mask(terrain + '_conn')
+        neighbours = self.neighbours[index]
+        distance = int(field[neighbours[neighbours >= 0]].min()) + 1
+        if distance >= 65535:       # Not connected to the town
+            return
+        field[index] = min(distance, 65534)
+        frontier = numpy.array([index])
+        while len(frontier) > 0 and distance < 65534:
+            distance += 1
+            candidates = self.neighbours[frontier].ravel()
+            candidates = candidates[candidates >= 0]
+            candidates = numpy.unique(candidates[mask[candidates] & (field[candidates] > distance)])
+            field[candidates] = distance
+            frontier = candidates
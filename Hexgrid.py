@@ -1,23 +1,36 @@
+import heapq
+
 import numpy
 
+from Cache import ConnectivityCache
+import Log
+from Mapgen import IslandGenerator
+from Terrain import terrain_types
+
+log = Log.get_logger('hexgrid')
+
 class Hexgrid:
     '''Hexagonal grid for board management'''
-    def __init__(self,size_x,size_y):
+    def __init__(self,size_x,size_y,cache_bytes=16*1024*1024,neighbours=None):
         '''Creates centre coordinates of the hexagonal grids. Center of bottom left hex is 0,0. All hexes have a diameter of 2. size_y
          is rounded up to an even number. The hex coordinates are generated by staggering the x-coordinates of the even y-coordinates. The staggers are generated by
          repeating a [0,1] vector and reshaping. To make this work correctly, we need to add an even number of y-coordinates during the
-         coordinate calculations. '''
+         coordinate calculations. A neighbour table which was built before, for instance by the asset bundle, can be
+         passed in neighbours. '''
 
-        print('Initializing board of ' + str(size_x) + ' by ' + str(size_y) + ' hexes.')
+        log.debug('Initializing board of %s by %s hexes.', size_x, size_y)
 
         self.size_y = int(2 * numpy.ceil(size_y / 2))  # The size of the board in y-direction is constrained to even numbers. This makes generating the grid easier and it really makes to difference to the game.
         self.size_x = size_x
         self.n_hexes = size_y * size_x                  # Number of tiles on the board
-        self.tiles = list([''] * self.n_hexes)          # List with labels containing the tile type for each hex.
+        self.tiles = numpy.full(self.n_hexes, terrain_types.empty, dtype=numpy.uint8)  # Code of the tile type of each hex, see Terrain.TerrainTypes
         self.objects = list([None] * self.n_hexes)      # List of objects (guys, boats) on the grid
-        self.objects_init = list([''] * self.n_hexes)   # List of names of the objects on the board during init.
+        self.occupied = numpy.zeros(self.n_hexes, dtype=bool)  # Mask of the hexes which contain an object. Kept in sync with objects by Grid.place_object and remove_object.
+        self.object_kinds = numpy.zeros(self.n_hexes, dtype=numpy.uint8)   # Kind (Pawn.Kind) of the object on each hex during init, 0 for none
+        self.object_owners = numpy.zeros(self.n_hexes, dtype=numpy.uint8)  # Number of the player owning that object
         self.selected = []                              # Index of the hex containing the currently selected pawn . Passing this index handles most game functionality.
         self.select_reachable = numpy.array([])         # Index list of the hexes reachable for the currently selected pawn.
+        self.select_reachable_set = frozenset()         # The same hexes as a set, for constant time membership tests.
 
         ''' Generate the y-coordinates by repeating the y_coordinates 'size_x' times and transposing to x-first matrix orientation.
         NB, the hex centers in y direction are in reality 0.75 apart. To mame things easier, I account for this in the visualizer.'''
@@ -30,129 +43,355 @@ class Hexgrid:
         # The stagger values (0 or 1) are added to an array containing x coordinates (0-size_x repeated size_y times).
         self.x_coords = numpy.add(numpy.array(list(range(0, 2 * size_x, 2)) * size_y), + x_stagger)
 
-        # The hexes at the edges and corners of the board have less than 6 connections and need to handled separately/
-        north = numpy.array(range(1, size_x - 1, 1))
-        west = numpy.array(range(size_x, size_x * (size_y - 1), size_x))
-        south = numpy.array(range(size_x * (size_y - 1) + 1, self.n_hexes - 1, 1))
-        east = numpy.array(range(2 * size_x - 1, size_x * (size_y - 1), size_x))
-
-        north_west = 0
-        north_east = size_x - 1
-        south_west = size_x * (size_y - 1)
-        south_east = self.n_hexes - 1
-
         # List of all hexes
         self.all_hexes = numpy.array(range(0, self.n_hexes))
 
-        # For assigning the oblique connections we need to distinguish between even and uneven rows.
-        odd_rows = self.all_hexes[numpy.in1d(self.y_coords, numpy.array(range(0, size_y * 2, 4)))]
-        even_rows = self.all_hexes[numpy.in1d(self.y_coords, numpy.array(range(2, size_y * 2, 4)))]
+        ''' Besides the index, each hex has axial coordinates (q, r): r is the row number and q runs along the row, shifted
+        half a hex per row so that the six neighbours of every hex are found at the same coordinate offsets. Hexes in
+        rows with an uneven row number are staggered half a hex to the east. The offsets are listed in
+        axial_directions in the order east, north-east, north-west, west, south-west and south-east.
+
+        The connectivity of the board is stored as a neighbour table: one row per hex with the indices of its (at most
+        six) neighbours in the order of axial_directions, padded with -1 for hexes at the edges and corners of the
+        board. '''
+        self.n_rows = self.n_hexes // size_x
+        self.axial_directions = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
+        if neighbours is not None:
+            self.neighbours = neighbours
+        else:
+            (q, r) = self.index_to_axial(self.all_hexes)
+            self.neighbours = numpy.full((self.n_hexes, 6), -1, dtype=self.get_index_dtype(self.n_hexes))
+            for direction, (d_q, d_r) in enumerate(self.axial_directions):
+                self.neighbours[:, direction] = self.axial_to_index(q + d_q, r + d_r)
+
+        # Terrain masks identify which hexes can be entered for each connectivity type, which hexes are home towns and
+        # which hexes have each resource terrain. They are kept in sync with the tiles by set_tile and set_tiles.
+        self.all_mask = numpy.ones(self.n_hexes, dtype=bool)
+        self.land_mask = numpy.zeros(self.n_hexes, dtype=bool)
+        self.water_mask = numpy.zeros(self.n_hexes, dtype=bool)
+        self.home_mask = numpy.zeros(self.n_hexes, dtype=bool)
+        self.terrain_masks = dict((name, numpy.zeros(self.n_hexes, dtype=bool))
+                                  for name in terrain_types.resource_terrains)
+
+        # Bookkeeping for the breadth-first searches in get_layers. A hex has been visited during the current search if
+        # its stamp equals the search number, this way the array never needs to be cleared between searches.
+        self.visit_stamp = numpy.zeros(self.n_hexes, dtype=numpy.uint32)
+        self.visit_number = 0
+
+        # Results of get_layers are kept in a size-bounded cache which is invalidated whenever the terrain changes.
+        self.connectivity_cache = ConnectivityCache(cache_bytes)
+
+    def find_path(self, start, goal, conn_list_name, adjacent=False):
+        ''' A* search for a shortest route from hex start to hex goal over the hexes of terrain conn_list_name. The start
+        hex does not need to be part of the terrain, so pieces can set out from a town. If adjacent is True the route ends
+        next to goal instead of on it, which is how boats reach harbours and homes. The hex distance to goal never
+        overestimates the number of steps left, so the first route found is a shortest one.
+
+        Returns the list of hexes on the route, start and end included, and the number of steps, or an empty list and -1
+        if goal cannot be reached.'''
+        mask = self.get_terrain_mask(conn_list_name)
+        margin = 1 if adjacent else 0
+
+        def estimate(index):
+            # Hex distance to goal, minus the last step if the route may end next to goal
+            return max(int(self.get_hex_distance(index, goal)) - margin, 0)
+
+        if adjacent:
+            targets = set(i for i in self.neighbours[goal].tolist() if i >= 0 and mask[i])
+            if estimate(start) == 0:
+                targets.add(start)
+        else:
+            targets = set([goal])
+
+        came_from = {start: -1}
+        cost = {start: (0, estimate(start))}    # Hex -> (fewest steps found so far, estimate of the steps left)
+        queue = [(cost[start][1], 0, start)]    # (estimated total, -steps so far, hex). Ties go to the longest route so far.
+        while queue:
+            (total, steps, index) = heapq.heappop(queue)
+            steps = -steps
+            if steps > cost[index][0]:  # An outdated entry, the hex was reached in fewer steps later on
+                continue
+            if index in targets:
+                route = [index]
+                while came_from[route[-1]] != -1:
+                    route.append(came_from[route[-1]])
+                return route[::-1], steps
+            for next_index in self.neighbours[index].tolist():
+                if next_index < 0 or not mask[next_index]:
+                    continue
+                known = cost.get(next_index)
+                if known is None:
+                    known = (self.n_hexes, estimate(next_index))
+                if steps + 1 < known[0]:
+                    cost[next_index] = (steps + 1, known[1])
+                    came_from[next_index] = index
+                    heapq.heappush(queue, (steps + 1 + known[1], -(steps + 1), next_index))
+        return [], -1
+
+    def get_distance_field(self, index, conn_list_name):
+        ''' Returns a uint16 array with for every hex the number of steps from hex index over terrain conn_list_name, or
+        65535 if it cannot be reached. Hex index itself does not need to be part of the terrain, so the field of a town
+        gives the distance for pieces setting out from or returning to it. Distances beyond 65534 are capped.'''
+        field = numpy.full(self.n_hexes, 65535, dtype=numpy.uint16)
+        mask = self.get_terrain_mask(conn_list_name)
+        start = self.neighbours[index]
+        start = start[start >= 0]
+        (hexes, distances) = self.get_distances(start[mask[start]], conn_list_name, self.n_hexes, cache=False)
+        field[hexes] = numpy.minimum(distances + 1, 65534)
+        field[index] = 0
+        return field
+
+    def get_distances(self, index_list, conn_list_name, dist, cache=True):
+        ''' Returns two arrays from a single breadth-first search: the hexes within dist steps of the hexes in index_list
+        according to connectivity conn_list_name (the start hexes themselves included), and the number of steps to each
+        of them. See get_layers for cache.'''
+        layers = self.get_layers(index_list, conn_list_name, dist, cache)
+        hexes = numpy.concatenate(layers)
+        distances = numpy.repeat(numpy.arange(len(layers)), [len(layer) for layer in layers])
+        return hexes, distances
 
-        # Now we determine which hexes are not at the edges by concatenating all edges...
-        edge = numpy.concatenate([south, east, west, north, [south_east, south_west, north_east, north_west]])
-        # ...and removing them from a list of all hexes on the grid.
-        inside = numpy.setdiff1d(self.all_hexes, edge)
+    def get_distances_batch(self, index_list, conn_list_name, dist):
+        ''' Runs a separate breadth-first search from each hex in index_list, all of them in one vectorized pass. The
+        searches are kept apart by numbering the search states source * n_hexes + hex, where source is the position of
+        the start hex in index_list. Returns a list with for each hex in index_list the two arrays get_distances would
+        return for that hex alone, in the same order.'''
+        mask = self.get_terrain_mask(conn_list_name)
+        sources = numpy.array(index_list, dtype=int).ravel()
+        if len(sources) == 0:
+            return []
 
-        ''' Now we need to process each of the six connectivity directions separately by listing the hex indices for which the direction applies.
-        The connections are stored in a matrix, where the rows identify the hex of origin and the rows the destination.
+        frontier = (numpy.arange(len(sources)) * self.n_hexes + sources)[mask[sources]]
+        previous = frontier[:0]
+        layers = [frontier]
+        for step in range(dist):
+            # Expand all searches at once. The neighbours of a state belong to the same search as the state itself.
+            search = numpy.repeat(frontier // self.n_hexes, 6)
+            candidates = self.neighbours[frontier % self.n_hexes].ravel()
+            keep = candidates >= 0
+            search = search[keep]
+            candidates = candidates[keep]
+            keep = mask[candidates]
+            candidates = search[keep] * self.n_hexes + candidates[keep]
+            # In a breadth-first search the neighbours of a layer lie in the previous layer, the layer itself or the next
+            candidates = numpy.setdiff1d(candidates, numpy.concatenate([previous, frontier]))
+            if len(candidates) == 0:
+                break
+            (previous, frontier) = (frontier, candidates)
+            layers.append(frontier)
 
-        For the connectivity matrix, it kind of makes sense to use booleans, but that seems
-        to make the matrix multiplications in we do to get n-step connections a lot slower. Maybe they're cast to numericals?
-        Anyway, I'm not using booleans because it's slow. '''
-        self.all_conn_1 = numpy.zeros((self.n_hexes, self.n_hexes))  # Initialize the connectivity matrix with zeros.
-        select = numpy.concatenate([inside, west, south, north, [south_west, north_west]])  # Connections to the east
-        self.all_conn_1[(select), (select) + 1] = 1
+        # Order the states by search, then by distance and hex like get_distances does, and split them per search
+        states = numpy.concatenate(layers)
+        distances = numpy.repeat(numpy.arange(len(layers)), [len(layer) for layer in layers])
+        search = states // self.n_hexes
+        hexes = states % self.n_hexes
+        order = numpy.lexsort((hexes, distances, search))
+        bounds = numpy.searchsorted(search[order], numpy.arange(1, len(sources)))
+        return list(zip(numpy.split(hexes[order], bounds), numpy.split(distances[order], bounds)))
 
-        select = numpy.concatenate([inside, east, south, north, [south_east, north_east]])  # Connections to the west
-        self.all_conn_1[(select), (select) - 1] = 1
+    def get_hex_at(self, x, y, hex_size):
+        ''' Returns the index of the hex drawn under pixel x, y when the hexes are drawn hex_size pixels wide, or -1 if
+        the pixel is outside the board. The hexes are pointy-top, as wide as they are high, with their centres at
+        get_pixel_centres and the rows 0.75 hex apart. The pixel is converted to fractional axial coordinates with the
+        pointy-top formula for this shape and rounded to the hex containing it.'''
+        x = x / hex_size - 0.5      # Position relative to the centre of hex 0, in hex widths
+        y = y / hex_size - 0.5
+        r = y / 0.75
+        q = x - r / 2
+        return int(self.round_axial(q, r))
 
-        select = numpy.intersect1d(numpy.concatenate([inside, east, south]), odd_rows)  # north-west connections, odd row numbers.
-        self.all_conn_1[(select), (select) - size_x - 1] = 1
-        select = numpy.intersect1d(numpy.concatenate([inside, east, south, west, [south_west, south_east]]), even_rows)  # north-west connections, even row numbers.
-        self.all_conn_1[(select), (select) - size_x] = 1
+    def get_hex_distance(self, index_a, index_b):
+        ''' Returns the number of steps between hexes index_a and index_b when all terrain can be crossed. Accepts
+        numbers as well as numpy arrays.'''
+        (q_a, r_a) = self.index_to_axial(index_a)
+        (q_b, r_b) = self.index_to_axial(index_b)
+        d_q = q_a - q_b
+        d_r = r_a - r_b
+        return (numpy.abs(d_q) + numpy.abs(d_r) + numpy.abs(d_q + d_r)) // 2
 
-        select = numpy.intersect1d(numpy.concatenate([inside, west, north, east, [north_west, north_east]]), odd_rows)  # Connections to the south-east, odd rows
-        self.all_conn_1[(select), (select) + size_x] = 1
-        select = numpy.intersect1d(numpy.concatenate([inside, west, north]), even_rows)  # Connections to the south-east, even rows
-        self.all_conn_1[(select), (select) + size_x + 1] = 1
+    def get_hexes_in_range(self, index, radius):
+        ''' Returns the indices of all hexes within radius steps of hex index, including index itself, regardless
+        of terrain.'''
+        (q, r) = self.index_to_axial(index)
+        d_q = numpy.concatenate([numpy.arange(max(-radius, -d_r - radius), min(radius, -d_r + radius) + 1)
+                                 for d_r in range(-radius, radius + 1)])
+        d_r = numpy.concatenate([numpy.full(min(radius, -d_r + radius) - max(-radius, -d_r - radius) + 1, d_r)
+                                 for d_r in range(-radius, radius + 1)])
+        in_range = self.axial_to_index(q + d_q, r + d_r)
+        return in_range[in_range >= 0]
 
-        select = numpy.intersect1d(numpy.concatenate([inside, west, east, south]), odd_rows)  # Connections to the north-east, odd rows
-        self.all_conn_1[(select), (select) - size_x] = 1
-        select = numpy.intersect1d(numpy.concatenate([inside, west, south, [south_west]]), even_rows)  # Connections to the north-east, even rows
-        self.all_conn_1[(select), (select) - size_x + 1] = 1
+    def get_index_dtype(self, n):
+        ''' Returns the smallest signed integer type which can hold hex indices up to n as well as the -1 padding.'''
+        if n < numpy.iinfo(numpy.int16).max:
+            return numpy.int16
+        return numpy.int32
 
-        select = numpy.intersect1d(numpy.concatenate([inside, north, east, [north_east]]), odd_rows)  # Connections to the south-west, odd rows
-        self.all_conn_1[(select), (select) + size_x - 1] = 1
-        select = numpy.intersect1d(numpy.concatenate([inside, north, east, west]), even_rows)  # Connections to the south-west, even rows
-        self.all_conn_1[(select), (select) + size_x] = 1
+    def axial_to_index(self, q, r):
+        ''' Returns the hex index for axial coordinates q, r, or -1 if the coordinates are outside the board. Accepts
+        numbers as well as numpy arrays.'''
+        q = numpy.asarray(q)
+        r = numpy.asarray(r)
+        column = q + (r - (r & 1)) // 2
+        valid = (r >= 0) & (r < self.n_rows) & (column >= 0) & (column < self.size_x)
+        return numpy.where(valid, r * self.size_x + column, -1)
 
     def get_connections(self,index_list,conn_list_name,dist):
-        ''' Returns all hex indices of tiles which are dist away from all hexes in index_list according to connectivity matrix conn_list_name'''
-        # Check if the list of connections has been extended far enough to fulfill the request. If not then add it.
-        try:
-            print('Retrieving connections ' + conn_list_name + '_' + str(dist))
-            connections = getattr(self, conn_list_name + '_' + str(dist))
-
-        except AttributeError:
-            print('Generating ' + str(dist) + '-step connectivity matrix for ' + conn_list_name)
-            ''' Retrieve the dist-min-1-step connectivity for conn_list_name. 
-            If this isn't found, it is created by running this function recursively.'''
-            try:
-                connection_dist_min_one = getattr(self, conn_list_name + '_' + str(dist-1))
-            except AttributeError:
-                self.get_connections(index_list,conn_list_name,dist-1)
-                connection_dist_min_one = getattr(self, conn_list_name + '_' + str(dist - 1))
-
-            ''' Somehow, if we just exponate the connectivities which have narrow bridges, there are steps missing. 
-            We fix this by multipling dist-min-one connectivity with the full connectivity and then removing the 
-            rows and columns of the unreachable hexes according to the original connectivity matrix of dist-min-one.'''
-            all_conn_1 = getattr(self,'all_conn_1')       # Get the connectivity for all hexes
-            connections = numpy.add(numpy.dot(connection_dist_min_one,all_conn_1),connection_dist_min_one)  # Calculate the dist-steps connectivity
-            remove = numpy.where(sum(connection_dist_min_one) == 0)
-            connections[remove,:] = 0
-            connections[:,remove] = 0
-            setattr(self,conn_list_name + '_' + str(dist), connections)       # Store the new connectivity matrix because we will probably need it again
-
-        # Return indices to the columns which contain a number for any of the rows in Index_list, excluding the hexes in index_list themselves
-        return numpy.setdiff1d(numpy.where(connections[index_list,:].sum(0)>0), index_list)
-
-    def grow_land(self, number, tile_file):
-        ''' Put the land tiles in a stack and shuffle'''
-        self.tile_draw = DrawPile(tile_file, 'tile_drawpile')
-
-        '''Generates an island of "number" land tiles starting from a random hex.'''
-        # Randomly pick starting hex and set the tile
-        this_index = numpy.random.randint(0, self.n_hexes - 1)
-        drawn_tile = self.tile_draw.lose_card()
-        print('Land tile ' + drawn_tile.name + ' added to hex ' + str(this_index))
-        self.tiles[this_index] = drawn_tile.name
-        index_list = [this_index]
-        # Add the remaining tiles to the start hex
-        for i in range(1, number):
-            # Retrieve the neighboring hexes of the already placed land tiles
-            neighbours = self.get_connections(index_list, 'all_conn', 1)
-            # Select a random hex from the neighbours
-            this_index = neighbours[numpy.random.randint(0, len(neighbours))]
-            drawn_tile = self.tile_draw.lose_card()
-            print('Land tile ' + drawn_tile.name + ' added to hex ' + str(this_index))
-
-            # Add a land tile label to the tiles list
-            self.tiles[this_index] = drawn_tile.name
-            # Add the new index to the index_list for use in the next iterations
-            index_list.append(this_index)
-
-        self.set_land_connectivity()
-
-    def set_land_connectivity(self):
-        # To get the connectivity matrix for the landmass, we copy the full board connectivity and set the not-land rows and columns to 0
-        self.land_conn_1 = numpy.array(self.all_conn_1)                     # Copy the full connectivity, using '=' creates a link instead of a copy!
-        not_land = [i for i, x in enumerate(self.tiles) if x in ['water','home']]
-        self.land_conn_1[not_land, :] = 0
-        self.land_conn_1[:, not_land] = 0
-
-    def set_water_connectivity(self):
-        # Set the connectivity matrix for water
-        self.water_conn_1 = numpy.array(self.all_conn_1)
-        not_water = [i for i, x in enumerate(self.tiles) if x not in ['water']]
-        self.water_conn_1[not_water, :] = 0
-        self.water_conn_1[:, not_water] = 0
\ No newline at end of file
+        ''' Returns all hex indices of tiles which are dist away from all hexes in index_list according to connectivity conn_list_name'''
+        log.debug('Retrieving connections %s_%s', conn_list_name, dist)
+        layers = self.get_layers(index_list, conn_list_name, dist)
+        # Return the indices of the reached hexes, excluding the hexes in index_list themselves
+        return numpy.sort(numpy.concatenate(layers[1:] + [numpy.array([], dtype=int)]))
+
+    def get_layers(self, index_list, conn_list_name, dist, cache=True):
+        ''' Breadth-first search from all hexes in index_list at once. Returns a list of index arrays: entry 0 holds the
+        hexes of index_list which are part of terrain conn_list_name, entry n holds the hexes which are exactly n steps
+        away from the nearest of them. The search stops after dist steps, or earlier if no new hexes are found. The
+        result is kept in the connectivity cache, unless cache is False. '''
+        if cache:
+            key = self.connectivity_cache.make_key(index_list, conn_list_name, dist)
+            layers = self.connectivity_cache.get(key)
+            if layers is not None:
+                return layers
+        mask = self.get_terrain_mask(conn_list_name)
+
+        # Start a new search number. In the unlikely case the counter is about to overflow, clear the stamps.
+        if self.visit_number == numpy.iinfo(numpy.uint32).max:
+            self.visit_stamp[:] = 0
+            self.visit_number = 0
+        self.visit_number += 1
+
+        frontier = numpy.unique(numpy.array(index_list, dtype=int).ravel())
+        frontier = frontier[mask[frontier]]
+        self.visit_stamp[frontier] = self.visit_number
+        layers = [frontier]
+        for step in range(dist):
+            # Collect the neighbours of the frontier which are part of the terrain and which were not visited yet
+            candidates = self.neighbours[frontier].ravel()
+            candidates = candidates[candidates >= 0]
+            candidates = candidates[mask[candidates] & (self.visit_stamp[candidates] != self.visit_number)]
+            if len(candidates) == 0:
+                break
+            frontier = numpy.unique(candidates).astype(int)
+            self.visit_stamp[frontier] = self.visit_number
+            layers.append(frontier)
+        if cache:
+            self.connectivity_cache.put_layers(key, layers)
+        return layers
+
+    def get_line(self, index_a, index_b):
+        ''' Returns the list of hexes on the straight line from index_a to index_b, both included. The line is sampled
+        at every step and each sample is rounded to the nearest hex.'''
+        n = int(self.get_hex_distance(index_a, index_b))
+        (q_a, r_a) = self.index_to_axial(index_a)
+        (q_b, r_b) = self.index_to_axial(index_b)
+        if n == 0:
+            return [int(index_a)]
+        # A small nudge makes sure that samples exactly on the edge between two hexes are rounded consistently. Along the
+        # side of the board such a sample may be rounded to a hex outside the board, then the nudge is reversed.
+        t = numpy.arange(n + 1) / n
+        q = q_a + (q_b - q_a) * t
+        r = r_a + (r_b - r_a) * t
+        line = self.round_axial(q + 1e-6, r + 2e-6)
+        line = numpy.where(line >= 0, line, self.round_axial(q - 1e-6, r - 2e-6))
+        return [int(i) for i in line]
+
+    def get_neighbour(self, index, direction):
+        ''' Returns the index of the neighbour of hex index in direction (0-5, see axial_directions), or -1 if that
+        neighbour would be outside the board.'''
+        (q, r) = self.index_to_axial(index)
+        (d_q, d_r) = self.axial_directions[direction]
+        return int(self.axial_to_index(q + d_q, r + d_r))
+
+    def get_pixel_centres(self, hex_size):
+        ''' Returns the pixel coordinates x, y of the centres of all hexes when they are drawn hex_size pixels wide. Hex
+        centres are one hex apart in x direction and 0.75 hex apart in y direction, see get_hex_at.'''
+        return (self.x_coords + 1) * hex_size / 2, (self.y_coords * 0.75 + 1) * hex_size / 2
+
+    def get_terrain_mask(self, conn_list_name):
+        ''' Returns the boolean mask of the hexes belonging to connectivity type conn_list_name (all_conn, land_conn or water_conn).'''
+        return getattr(self, conn_list_name.replace('_conn', '') + '_mask')
+
+    def get_tile(self, index):
+        ''' Returns the name of the tile type of hex index.'''
+        return terrain_types.get_name(self.tiles[index])
+
+    def grow_land(self, number, tile_file, n_islands=1, min_gap=1, seed=None):
+        '''Generates n_islands islands of "number" land tiles in total, at least min_gap water hexes apart. All other
+        hexes become water. See Mapgen.IslandGenerator.'''
+        generator = IslandGenerator(self, tile_file, seed)
+        self.set_tiles(generator.generate(number, n_islands, min_gap))
+
+    def index_to_axial(self, index):
+        ''' Returns the axial coordinates q, r of hex index. Accepts numbers as well as numpy arrays.'''
+        index = numpy.asarray(index)
+        r = index // self.size_x
+        q = index % self.size_x - (r - (r & 1)) // 2
+        return q, r
+
+    def iter_ring(self, index, radius):
+        ''' Iterates over the hexes which are exactly radius steps away from hex index, starting at the south-west corner of
+        the ring and going round counter-clockwise. Positions outside the board are skipped.'''
+        if radius == 0:
+            yield int(index)
+            return
+        (q, r) = self.index_to_axial(index)
+        # Start at the hex radius steps to the south-west and walk radius steps in each of the six directions
+        (d_q, d_r) = self.axial_directions[4]
+        q = q + d_q * radius
+        r = r + d_r * radius
+        for (d_q, d_r) in self.axial_directions:
+            for step in range(radius):
+                ring_index = int(self.axial_to_index(q, r))
+                if ring_index >= 0:
+                    yield ring_index
+                q = q + d_q
+                r = r + d_r
+
+    def iter_spiral(self, index, radius):
+        ''' Iterates over all hexes within radius steps of hex index, starting with index itself and then ring by ring
+        outwards.'''
+        for ring_radius in range(radius + 1):
+            for ring_index in self.iter_ring(index, ring_radius):
+                yield ring_index
+
+    def round_axial(self, q, r):
+        ''' Rounds fractional axial coordinates to the index of the hex containing them, or -1 if that hex is outside the
+        board. The coordinates are rounded in cube coordinates, where the rounded component with the largest error is
+        recomputed from the other two.'''
+        q = numpy.asarray(q, dtype=float)
+        r = numpy.asarray(r, dtype=float)
+        s = -q - r
+        q_round = numpy.round(q)
+        r_round = numpy.round(r)
+        s_round = numpy.round(s)
+        q_error = numpy.abs(q_round - q)
+        r_error = numpy.abs(r_round - r)
+        s_error = numpy.abs(s_round - s)
+        q_round = numpy.where((q_error > r_error) & (q_error > s_error), -r_round - s_round, q_round)
+        r_round = numpy.where((r_error >= q_error) & (r_error > s_error), -q_round - s_round, r_round)
+        return self.axial_to_index(q_round.astype(int), r_round.astype(int))
+
+    def set_terrain_masks(self):
+        ''' Recomputes all terrain masks from the tiles and invalidates the cached connectivity results.'''
+        self.land_mask = terrain_types.is_land[self.tiles]
+        self.water_mask = terrain_types.is_water[self.tiles]
+        self.home_mask = self.tiles == terrain_types.home
+        for name in self.terrain_masks:
+            self.terrain_masks[name] = self.tiles == terrain_types.get_code(name)
+        self.connectivity_cache.invalidate()
+
+    def set_tile(self, index, tile):
+        ''' Sets the tile type of hex index, updates the terrain masks for that hex and invalidates the cached
+        connectivity results. All changes to self.tiles should go through here to keep the cache valid.'''
+        code = terrain_types.get_code(tile)
+        self.tiles[index] = code
+        self.land_mask[index] = terrain_types.is_land[code]
+        self.water_mask[index] = terrain_types.is_water[code]
+        self.home_mask[index] = code == terrain_types.home
+        for name in self.terrain_masks:
+            self.terrain_masks[name][index] = tile == name
+        self.connectivity_cache.invalidate()
+
+    def set_tiles(self, tiles):
+        ''' Sets the tile codes of all hexes at once and recomputes the terrain masks.'''
+        self.tiles = numpy.asarray(tiles, dtype=numpy.uint8)
+        self.set_terrain_masks()
@@ -0,0 +1,88 @@
+'''Logging facade for the game. Every module logs through its own subsystem logger from get_logger, for example
+log = Log.get_logger('grid'). Messages are passed with %-style arguments, like log.info('Pawn %s moved to %s', label,
+index), so a message is only formatted when its subsystem actually logs it at that level.
+
+Until configure is called nothing is logged below warning level and nothing is written at all, so simulations and
+servers only pay for a level check. configure reads the [Logging] section of the game config:
+
+[Logging]
+; level for all subsystems
+level = INFO
+; optional level per subsystem: assets, board, cards, pawn, hexgrid, mapgen, grid, game, visualiser
+cards = WARNING
+; write to the console
+console = yes
+; optional log file, written by a background thread so the game never waits for the disk
+file = game.log
+
+Unknown levels are reported and replaced by WARNING.
+'''
+import atexit
+import logging
+import logging.handlers
+import queue
+
+subsystems = ['assets', 'board', 'cards', 'pawn', 'hexgrid', 'mapgen', 'grid', 'game', 'visualiser']
+root = logging.getLogger('game')            # Parent of all subsystem loggers
+root.addHandler(logging.NullHandler())      # Nothing is written until configure is called
+root.setLevel(logging.WARNING)
+root.propagate = False
+file_listener = None                        # Background thread of the log file, see configure
+
+
+def configure(config):
+    ''' Sets the levels and outputs of the game loggers from the [Logging] section of config. Missing options keep
+    their defaults: warning level, console output and no log file.'''
+    global file_listener
+    stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    formatter = logging.Formatter('%(asctime)s %(name)s %(levelname)s: %(message)s')
+
+    root.setLevel(get_level(config, 'level', 'WARNING'))
+    for subsystem in subsystems:
+        get_logger(subsystem).setLevel(get_level(config, subsystem, 'NOTSET'))
+
+    if config.getboolean('Logging', 'console', fallback=True):
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        root.addHandler(console)
+    file_name = config.get('Logging', 'file', fallback='')
+    if file_name:
+        # The game only puts the records on a queue, a listener thread formats them and writes them to the file.
+        records = queue.Queue(-1)
+        root.addHandler(logging.handlers.QueueHandler(records))
+        log_file = logging.FileHandler(file_name)
+        log_file.setFormatter(formatter)
+        file_listener = logging.handlers.QueueListener(records, log_file)
+        file_listener.start()
+    if not root.handlers:
+        root.addHandler(logging.NullHandler())
+
+
+def get_level(config, option, fallback):
+    ''' Returns the level set by option in the [Logging] section of config, fallback if it is not set, or WARNING if it
+    is not a known level.'''
+    level = config.get('Logging', option, fallback=fallback).strip().upper()
+    if not isinstance(logging.getLevelName(level), int):
+        logging.getLogger(__name__).warning('Unknown log level %s for %s, using WARNING', level, option)
+        return 'WARNING'
+    return level
+
+
+def get_logger(subsystem):
+    ''' Returns the logger of a subsystem of the game.'''
+    return root.getChild(subsystem)
+
+
+def stop():
+    ''' Writes the records which are still queued for the log file and stops its background thread.'''
+    global file_listener
+    if file_listener:
+        file_listener.stop()
+        for handler in file_listener.handlers:
+            handler.close()
+        file_listener = None
+
+
+atexit.register(stop)
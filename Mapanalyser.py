@@ -0,0 +1,171 @@
+'''Map analyser. Checks a board before it is played: the land is split into islands and the water into seas, and the
+analyser reports harbours without access to the water, homes which the boats of their owner cannot reach, the mix of
+resource terrains on each island and how fair the start positions are. Run it from the command line to check the board
+of a config file, or another board:
+
+python Mapanalyser.py Config.ini --board board.csv --size 30 30
+'''
+import argparse
+
+import numpy
+
+from Pawn import Kind
+from Terrain import terrain_types
+
+
+def label_components(mask, neighbours):
+    ''' Labels the connected components of the hexes in mask with union-find. Returns an int array with for each hex the
+    number of its component (0, 1, ...) or -1 for hexes outside the mask, and the number of components.
+
+    The union-find runs on all edges at once: in each round every edge between two different components links the
+    root with the higher number to the lowest root it meets, and then all paths are compressed by pointer jumping.'''
+    n = len(mask)
+    parent = numpy.arange(n)
+    # Each edge once: the east, north-east and north-west neighbours of every hex (see Hexgrid.axial_directions)
+    u = numpy.repeat(numpy.arange(n), 3)
+    v = neighbours[:, :3].ravel().astype(int)
+    keep = v >= 0
+    (u, v) = (u[keep], v[keep])
+    keep = mask[u] & mask[v]
+    (u, v) = (u[keep], v[keep])
+    while len(u) > 0:
+        parent = compress(parent)
+        (root_u, root_v) = (parent[u], parent[v])
+        linked = root_u != root_v
+        (u, v, root_u, root_v) = (u[linked], v[linked], root_u[linked], root_v[linked])
+        numpy.minimum.at(parent, numpy.maximum(root_u, root_v), numpy.minimum(root_u, root_v))
+    parent = compress(parent)
+    labels = numpy.full(n, -1, dtype=int)
+    (roots, labels[mask]) = numpy.unique(parent[mask], return_inverse=True)
+    return labels, len(roots)
+
+
+def compress(parent):
+    ''' Points every hex directly at the root of its tree by repeated pointer jumping.'''
+    while True:
+        grand_parent = parent[parent]
+        if numpy.array_equal(grand_parent, parent):
+            return parent
+        parent = grand_parent
+
+
+class MapAnalyser:
+    '''Analysis of the board of a grid: the islands and seas, the towns on it and their connections. The towns are
+    taken from the start positions of the board (Hexgrid.object_kinds and object_owners), so a board can be checked
+    without starting a game.'''
+    def __init__(self, grid):
+        self.grid = grid
+        (self.islands, self.n_islands) = label_components(grid.land_mask, grid.neighbours)
+        (self.seas, self.n_seas) = label_components(grid.water_mask, grid.neighbours)
+        self.harbours = numpy.flatnonzero(grid.object_kinds == Kind.HARBOUR.value)
+        self.homes = numpy.flatnonzero(grid.object_kinds == Kind.HOME.value)
+
+    def get_boat_distance(self, harbour, home):
+        ''' Returns the number of moves a boat next to harbour needs to reach home, or -1 if it cannot.'''
+        field = self.grid.get_distance_field(home, 'water_conn')
+        neighbours = self.grid.neighbours[harbour]
+        neighbours = neighbours[neighbours >= 0]
+        distances = field[neighbours[self.grid.water_mask[neighbours]]]
+        distances = distances[distances != 65535]
+        if len(distances) == 0:
+            return -1
+        return int(distances.min())
+
+    def get_coast_seas(self, index):
+        ''' Returns the labels of the seas next to hex index.'''
+        neighbours = self.grid.neighbours[index]
+        neighbours = neighbours[neighbours >= 0]
+        return numpy.unique(self.seas[neighbours[self.grid.water_mask[neighbours]]])
+
+    def get_fairness(self):
+        ''' Returns for each player number a dict with the island of its harbour, the size of that island, the number
+        of hexes of each resource terrain on it and the number of boat moves from its harbour to its home (-1 if the
+        home cannot be reached by boat).'''
+        terrains = self.get_island_terrains()
+        sizes = numpy.bincount(self.islands[self.islands >= 0], minlength=self.n_islands)
+        players = {}
+        for harbour in self.harbours.tolist():
+            owner = int(self.grid.object_owners[harbour])
+            island = int(self.islands[harbour])
+            players[owner] = {'harbour': harbour, 'island': island, 'island_size': int(sizes[island]),
+                              'terrains': dict(zip(terrain_types.resource_terrains, terrains[island].tolist())),
+                              'home_distance': -1}
+            for home in self.homes[self.grid.object_owners[self.homes] == owner].tolist():
+                players[owner]['home_distance'] = self.get_boat_distance(harbour, home)
+        return players
+
+    def get_island_terrains(self):
+        ''' Returns an array with a row for each island and a column with the number of hexes of each resource terrain
+        (in the order of terrain_types.resource_terrains).'''
+        counts = numpy.zeros((self.n_islands, len(terrain_types.resource_terrains)), dtype=int)
+        for (column, name) in enumerate(terrain_types.resource_terrains):
+            islands = self.islands[self.grid.terrain_masks[name]]
+            counts[:, column] = numpy.bincount(islands, minlength=self.n_islands)
+        return counts
+
+    def get_problems(self):
+        ''' Returns a list of messages about towns which cannot be reached: harbours without a sea next to them and
+        homes which do not share a sea with the harbour of their owner.'''
+        problems = []
+        harbour_seas = {}
+        for harbour in self.harbours.tolist():
+            owner = int(self.grid.object_owners[harbour])
+            seas = self.get_coast_seas(harbour)
+            harbour_seas[owner] = seas
+            if len(seas) == 0:
+                problems.append('Harbour of player' + str(owner) + ' on hex ' + str(harbour) +
+                                ' has no access to the water')
+        for home in self.homes.tolist():
+            owner = int(self.grid.object_owners[home])
+            seas = self.get_coast_seas(home)
+            if len(seas) == 0:
+                problems.append('Home of player' + str(owner) + ' on hex ' + str(home) + ' has no access to the water')
+            elif owner not in harbour_seas:
+                problems.append('Home of player' + str(owner) + ' on hex ' + str(home) + ' has no harbour')
+            elif len(numpy.intersect1d(seas, harbour_seas[owner])) == 0:
+                problems.append('Home of player' + str(owner) + ' on hex ' + str(home) +
+                                ' cannot be reached by boat from its harbour')
+        return problems
+
+    def report(self):
+        ''' Returns the analysis as a list of lines of text.'''
+        lines = ['Board of ' + str(self.grid.n_hexes) + ' hexes with ' + str(self.n_islands) + ' islands and ' +
+                 str(self.n_seas) + ' seas.']
+        terrains = self.get_island_terrains()
+        for island in numpy.argsort(-terrains.sum(axis=1))[:10].tolist():
+            mix = ', '.join(name + ' ' + str(count) for (name, count) in
+                            zip(terrain_types.resource_terrains, terrains[island].tolist()))
+            lines.append('Island ' + str(island) + ': ' + mix)
+        players = self.get_fairness()
+        for owner in sorted(players):
+            player = players[owner]
+            lines.append('player' + str(owner) + ': harbour on island ' + str(player['island']) + ' (' +
+                         str(player['island_size']) + ' hexes), ' + str(player['home_distance']) +
+                         ' boat moves to home')
+        distances = [player['home_distance'] for player in players.values() if player['home_distance'] >= 0]
+        if distances:
+            lines.append('Difference in boat moves to home between players: ' + str(max(distances) - min(distances)))
+        problems = self.get_problems()
+        lines += problems or ['No unreachable harbours or homes.']
+        return lines
+
+
+if __name__ == '__main__':
+    import configparser
+
+    import Board
+    from Grid import Grid
+
+    parser = argparse.ArgumentParser(description='Checks a board for unreachable towns and reports on its islands.')
+    parser.add_argument('config_file', nargs='?', default='Config.ini', help='game config with the board to check')
+    parser.add_argument('--board', help='board file to check instead of the board of the config')
+    parser.add_argument('--size', type=int, nargs=2, metavar=('X', 'Y'), help='board size, if not that of the config')
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read(args.config_file)
+    board = Board.load(args.board or config.get('Game', 'board'))
+    (size_x, size_y) = args.size or (config.getint('Grid', 'hexes_x'), config.getint('Grid', 'hexes_y'))
+    grid = Grid(size_x, size_y, None)
+    grid.load_map(config, board)
+    print('\n'.join(MapAnalyser(grid).report()))
@@ -0,0 +1,147 @@
+'''Procedural island generator. Grows islands of land tiles on a hex grid filled with water and writes the result as a
+board file which Grid.load_map can read. Run it from the command line to create a board file:
+
+python Mapgen.py board_generated.csv --size 100 100 --land 0.4 --islands 5 --gap 2 --seed 1
+'''
+import argparse
+import csv
+import itertools
+
+import numpy
+
+from Cards import card_types
+import Log
+from Terrain import terrain_types
+
+log = Log.get_logger('mapgen')
+
+
+class IslandGenerator:
+    '''Grows islands on a hex grid. Every island keeps its own frontier: the water hexes next to its land. Islands grow
+    in rounds, in each round every island turns a random part of its frontier into land.
+
+    Islands keep a minimum number of water hexes between them. For this the generator keeps for every hex which island
+    has land within that distance; a hex near the land of another island never becomes land. The land types are spread
+    over the land in the ratios of the number of copies of each land type in the tile file. The same seed gives the
+    same map.'''
+    def __init__(self, grid, tile_file, seed=None):
+        self.grid = grid                                # Hexgrid with the neighbour table of the board
+        self.rng = numpy.random.RandomState(seed)
+        self.land_types = []                            # Terrain codes of the land tiles in the tile file
+        self.ratios = []                                # Number of copies of each land tile in the tile file
+        for (tile, copies) in card_types.load(tile_file):
+            if tile.name not in ['water', 'home'] and copies > 0:
+                self.land_types.append(terrain_types.get_code(tile.name))
+                self.ratios.append(copies)
+        self.island = numpy.full(grid.n_hexes, -1, dtype=numpy.int32)   # Island of each land hex, -1 for water
+        self.near = numpy.full(grid.n_hexes, -1, dtype=numpy.int32)     # Island with land within the gap, -2 for several
+        self.min_gap = 1
+
+    def add_land(self, island, hexes):
+        ''' Makes hexes land of island and marks the hexes within the minimum gap as near the island.'''
+        self.island[hexes] = island
+        ball = hexes
+        ring = hexes
+        for step in range(self.min_gap):
+            ring = self.grid.neighbours[ring].ravel()
+            ring = numpy.setdiff1d(ring[ring >= 0], ball)
+            ball = numpy.concatenate([ball, ring])
+        near = self.near[ball]
+        self.near[ball[near == -1]] = island
+        self.near[ball[(near >= 0) & (near != island)]] = -2
+
+    def generate(self, n_land, n_islands=1, min_gap=1, batch_fraction=0.25):
+        ''' Grows n_islands islands with n_land land tiles in total, with at least min_gap water hexes between islands.
+        Each round an island turns batch_fraction of its frontier into land. Islands which run out of room stop
+        growing, so the map can hold less land than asked for. Returns the terrain code of each hex as a uint8 array.'''
+        self.min_gap = min_gap
+        n_land = min(n_land, self.grid.n_hexes)
+        targets = [n_land // n_islands + (i < n_land % n_islands) for i in range(n_islands)]
+        sizes = [0] * n_islands
+        frontiers = [numpy.zeros(0, dtype=int)] * n_islands
+
+        # Start each island from a single hex which is not near another island.
+        for i in range(n_islands):
+            start = self.pick_start()
+            if start is None or targets[i] == 0:
+                targets[i] = 0
+                continue
+            self.add_land(i, numpy.array([start]))
+            sizes[i] = 1
+            frontiers[i] = self.grid.neighbours[start]
+
+        # Grow all islands a batch at a time until they reach their target or run out of frontier.
+        active = [i for i in range(n_islands) if sizes[i] < targets[i]]
+        while active:
+            for i in list(active):
+                frontier = numpy.unique(frontiers[i])
+                frontier = frontier[frontier >= 0]
+                near = self.near[frontier]
+                frontier = frontier[(self.island[frontier] < 0) & ((near == -1) | (near == i))]
+                if len(frontier) == 0:
+                    log.debug('Island %s stopped growing at %s of %s tiles', i, sizes[i], targets[i])
+                    active.remove(i)
+                    continue
+                n_new = min(int(len(frontier) * batch_fraction) + 1, targets[i] - sizes[i])
+                picked = self.rng.permutation(len(frontier))[:n_new]
+                batch = frontier[picked]
+                self.add_land(i, batch)
+                sizes[i] += n_new
+                frontiers[i] = numpy.concatenate([numpy.delete(frontier, picked), self.grid.neighbours[batch].ravel()])
+                if sizes[i] >= targets[i]:
+                    active.remove(i)
+        log.info('Generated %s islands with %s land tiles', sum(size > 0 for size in sizes), sum(sizes))
+        return self.get_tiles()
+
+    def get_tiles(self):
+        ''' Returns the terrain code of each hex: water, or a land type for the land hexes. The land types are dealt out
+        in exactly the ratios of the tile file, up to rounding, and shuffled over the land.'''
+        tiles = numpy.full(self.grid.n_hexes, terrain_types.water, dtype=numpy.uint8)
+        land = numpy.flatnonzero(self.island >= 0)
+        if len(land) == 0 or not self.land_types:
+            return tiles
+        shares = numpy.array(self.ratios, dtype=float) / sum(self.ratios) * len(land)
+        counts = numpy.floor(shares).astype(int)
+        # Hand out the tiles which are left after rounding down to the largest remainders
+        left = len(land) - counts.sum()
+        counts[numpy.argsort(counts - shares)[:left]] += 1
+        types = self.rng.permutation(numpy.repeat(numpy.arange(len(self.land_types)), counts))
+        tiles[land] = numpy.array(self.land_types, dtype=numpy.uint8)[types]
+        return tiles
+
+    def pick_start(self, attempts=100):
+        ''' Returns a random water hex which is not near any island, or None if there is no such hex.'''
+        for attempt in range(attempts):
+            index = self.rng.randint(0, self.grid.n_hexes)
+            if self.near[index] == -1:
+                return index
+        free = numpy.flatnonzero(self.near == -1)
+        if len(free) == 0:
+            return None
+        return free[self.rng.randint(0, len(free))]
+
+    def write(self, tiles, file_name):
+        ''' Writes tiles (terrain codes) to a board file in the format of Grid.load_map, without player objects.'''
+        with open(file_name, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=',')
+            writer.writerow(['index', 'tile', 'object', 'owner'])
+            writer.writerows(zip(itertools.count(), terrain_types.names[tiles], itertools.repeat(''),
+                                 itertools.repeat('')))
+
+
+if __name__ == '__main__':
+    from Hexgrid import Hexgrid
+
+    parser = argparse.ArgumentParser(description='Generates a board file with random islands.')
+    parser.add_argument('board_file', help='name of the board file to write')
+    parser.add_argument('--size', type=int, nargs=2, default=[12, 28], metavar=('X', 'Y'), help='board size in hexes')
+    parser.add_argument('--land', type=float, default=0.3, help='fraction of the board which becomes land')
+    parser.add_argument('--islands', type=int, default=1, help='number of islands')
+    parser.add_argument('--gap', type=int, default=1, help='minimum number of water hexes between islands')
+    parser.add_argument('--tiles', default='Land.ini', help='tile file with the land types and their ratios')
+    parser.add_argument('--seed', type=int, default=None, help='seed for a reproducible map')
+    args = parser.parse_args()
+
+    grid = Hexgrid(args.size[0], args.size[1], 0)
+    generator = IslandGenerator(grid, args.tiles, args.seed)
+    generator.write(generator.generate(int(args.land * grid.n_hexes), args.islands, args.gap), args.board_file)
@@ -1,15 +1,30 @@
+from enum import Enum
+
 import Cards
+import Log
+
+log = Log.get_logger('pawn')
+
+class Kind(Enum):
+    '''The kinds of game pieces. Each piece class has a kind attribute so the type of a piece can be checked without
+    parsing its label.'''
+    PAWN = 1
+    BOAT = 2
+    HARBOUR = 3
+    HOME = 4
 
 class Pawn:
     '''Class for moving board pieces. Each piece maintains its' own position on the board and checks with
     the grid what the movement options are. After each move the pawn arranges for the grid to update its'
     position in the grid's own board items list.'''
+    kind = Kind.PAWN
+
     def __init__(self,owner,label,color,terrain):
         ''' owner: label indicating the owner (generally a player) of the piece
             label: name of the piece
             color: color of the piece
         '''
-        print('Creating new pawn ' + label + ' for player ' + owner)
+        log.info('Creating new pawn %s for player %s', label, owner)
         
         self.owner = owner
         self.label = label
@@ -24,6 +39,9 @@ class Pawn:
         self.ring = 0
         self.moves_per_turn = 1
 
+        ''' The registry keeping track of the pawn's position, set when the pawn is placed on the board '''
+        self.registry = None
+
     def reset_moves(self):
         self.moves = self.moves_per_turn
 
@@ -40,11 +58,13 @@ class Pawn:
         self.ring = n
 
 class Boat(Pawn):
+    kind = Kind.BOAT
+
     def __init__(self,owner,label,color,terrain,slots):
-        print('Creating new boat ' + label + ' for player ' + owner)
+        log.info('Creating new boat %s for player %s', label, owner)
         super().__init__(owner,label,color,terrain)
         self.resource_slots = slots
-        self.resources = cards.SizedStack('resources',6)
+        self.resources = Cards.SizedStack('resources',6)
         #self.moves = 0
         #self.moves_per_turn = 3
         #self.ring = 2
@@ -55,18 +75,20 @@ class Boat(Pawn):
     def burn_fuel(self):
         ''' Destroys the selected  fuel resource and sets the moves to 0.'''
         if self.selected_fuel != -1:
-            burned = self.resources.stack.pop(self.selected_fuel)
-            print('Boat ' + self.label + ' burned resource ' + burned.name)
+            burned = self.resources.get_card(self.selected_fuel)
+            del self.resources.stack[self.selected_fuel]
+            log.info('Boat %s burned resource %s', self.label, burned.name)
             self.selected_fuel = -1
         else:
-            print('Boat ' + self.label + ' has no selected resource to burn')
+            log.info('Boat %s has no selected resource to burn', self.label)
 
 
     def deselect_fuel(self):
         ''' Deselects the selected fuel resource and updates the moves accordingly.'''
         if self.selected_fuel != -1: # Check whether fuel is selected
-            print('Boat ' + self.label + ' returning selected resource ' + self.resources.stack[self.selected_fuel].name + ' to resource stack')
-            self.moves = self.moves - int(self.resources.stack[self.selected_fuel].fuel)
+            log.info('Boat %s returning selected resource %s to resource stack',
+                     self.label, self.resources.get_card(self.selected_fuel).name)
+            self.moves = self.moves - self.resources.get_card(self.selected_fuel).fuel
             self.selected_fuel = -1
 
     def occupy(self,pawn_object):
@@ -74,10 +96,12 @@ class Boat(Pawn):
         if not self.occupying_pawn:                     # Check whether the boat already has an occupying pawn
             self.occupying_pawn = pawn_object           # Set the name of the ooccupying pawn
             pawn_object.moves = 0                       # Set the pawn's moves to 0 so it can't move out again this turn
-            print(pawn_object.label + ' is now manning ' + self.label)
+            if self.registry:                           # Let the registry know the pawn is now carried by the boat
+                self.registry.board(pawn_object, self)
+            log.info('%s is now manning %s', pawn_object.label, self.label)
             return None
         else:
-            print(self.label + ' is already occupied!')
+            log.info('%s is already occupied!', self.label)
             return pawn_object
 
     def reset_moves(self):
@@ -90,12 +114,13 @@ class Boat(Pawn):
 
     def select_fuel(self,index):
         ''' Selects the resourche indicated in index from the resource stack for burning and changes the moves accordingly'''
-        if self.moves > 0 and int(self.resources.stack[index].fuel) > 0: # If it is 0, the boat already used its moves; if the fuel value of the resource is 0 then it's not fuel
+        if self.moves > 0 and self.resources.get_card(index).fuel > 0: # If it is 0, the boat already used its moves; if the fuel value of the resource is 0 then it's not fuel
             self.selected_fuel = index
-            self.moves = self.moves_per_turn + int(self.resources.stack[index].fuel)
-            print('Boat ' + self.label + ' select resource ' + self.resources.stack[index].name + ' for burning. Number of moves is now ' + str(self.moves))
+            self.moves = self.moves_per_turn + self.resources.get_card(index).fuel
+            log.info('Boat %s select resource %s for burning. Number of moves is now %s',
+                     self.label, self.resources.get_card(index).name, self.moves)
         else:
-            print('Error selecting fuel for ' + self.label)
+            log.warning('Error selecting fuel for %s', self.label)
 
     def steal_resource_from_boat(self,target,resource_index):
         ''' Steals the indicated resource from the the indicated boat. '''
@@ -108,28 +133,34 @@ class Boat(Pawn):
                 else:   # Transfer failed, give the card back to the target
                     target.receive_card(returned)
         else:
-            print('Target object is not an enemy ship.')
+            log.warning('Target object is not an enemy ship.')
 
     def unboard(self):
         unboarding_pawn = self.occupying_pawn
         self.occupying_pawn = None
-        print(unboarding_pawn.label + ' is leaving ' + self.label)
+        if self.registry:
+            self.registry.unboard(unboarding_pawn)
+        log.info('%s is leaving %s', unboarding_pawn.label, self.label)
         self.reset_moves()
         return unboarding_pawn # This is the label of the pawn, not the actual object!
 
 class Harbour(Pawn):
+    kind = Kind.HARBOUR
+
     def __init__(self,owner,label,color,terrain):
         ''' a harbour is basically a non-moving pawn owning a stack of cards. '''
         super().__init__(owner,label,color,terrain)
         self.moves = 0
         self.moves_per_turn = 0
-        self.resources = cards.Stack('harbour')
+        self.resources = Cards.Stack('harbour')
 
 
 class Home(Pawn):
+    kind = Kind.HOME
+
     def __init__(self,owner,label,color,terrain):
         ''' a home is basically a non-moving pawn owning a stack of cards and assignment achievements '''
         super().__init__(owner,label,color,terrain)
         self.moves = 0
         self.moves_per_turn = 0
-        self.resources = cards.Stack('home')
+        self.resources = Cards.Stack('home')
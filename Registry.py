@@ -0,0 +1,54 @@
+class PieceRegistry:
+    '''Index of the game pieces on the board. Keeps track of which hex each piece is on, which pieces each player owns
+    and which pieces exist of each kind.
+
+    Pieces on the board are added and removed by Grid.place_object and Grid.remove_object. A pawn manning a boat is
+    not on the board itself; Boat.occupy and Boat.unboard register it as carried by the boat, its position is then
+    the position of the boat.'''
+    def __init__(self):
+        self.player_pieces = {}     # Owner label -> {hex index: piece} for the pieces on the board
+        self.kind_pieces = {}       # Pawn.Kind -> {piece: None} for all pieces on the board or carried by a boat
+        self.piece_hex = {}         # Piece -> hex index for the pieces on the board
+        self.carried = {}           # Pawn -> boat carrying it
+
+    def add(self, piece, index):
+        ''' Registers piece as being located on hex index.'''
+        piece.registry = self
+        self.player_pieces.setdefault(piece.owner, {})[index] = piece
+        self.kind_pieces.setdefault(piece.kind, {})[piece] = None
+        self.piece_hex[piece] = index
+
+    def board(self, pawn, boat):
+        ''' Registers pawn as carried by boat.'''
+        pawn.registry = self
+        self.carried[pawn] = boat
+        self.kind_pieces.setdefault(pawn.kind, {})[pawn] = None
+
+    def get_hex(self, piece):
+        ''' Returns the hex index of piece, the hex of the carrying boat for pawns manning a boat, or None if the piece
+        is not on the board.'''
+        if piece in self.carried:
+            piece = self.carried[piece]
+        return self.piece_hex.get(piece)
+
+    def get_pieces_by_kind(self, kind):
+        ''' Returns a list of all pieces of kind, on the board or carried by a boat.'''
+        return list(self.kind_pieces.get(kind, {}))
+
+    def get_player_pieces(self, owner):
+        ''' Returns a dict {hex index: piece} of all pieces of owner which are on the board.'''
+        return self.player_pieces.get(owner, {})
+
+    def remove(self, piece):
+        ''' Unregisters piece from the board. A pawn which is carried by a boat stays registered as carried.'''
+        index = self.piece_hex.pop(piece, None)
+        if index is not None:
+            del self.player_pieces[piece.owner][index]
+        if piece not in self.carried:
+            self.kind_pieces.get(piece.kind, {}).pop(piece, None)
+
+    def unboard(self, pawn):
+        ''' Unregisters pawn as carried. It is registered again when it is placed on the board.'''
+        self.carried.pop(pawn, None)
+        if pawn not in self.piece_hex:
+            self.kind_pieces.get(pawn.kind, {}).pop(pawn, None)
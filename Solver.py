@@ -0,0 +1,126 @@
+import collections
+
+import numpy
+
+from Cache import Cache
+from Cards import card_types
+
+
+class ResourceSolver:
+    '''Picks the cheapest set of resource cards from a stack which meets a tier1 requirement (ewsmf). Each picked card
+    counts for one of its resources, like a selection in the assignment popup. Two objectives are supported:
+    - 'cards': use as few cards as possible, ties are broken by the least wasted resource value,
+    - 'waste': use as little resource value as possible, so that the least value is spent beyond the requirement.
+    Ties are then broken by the number of cards.
+    Collectibles are protected by default: cards with a collect id are never used.
+
+    The solver is a bounded knapsack over the card types in the stack, with the residual requirement as state.
+    Solutions are memoized on the usable card types and the requirement.'''
+    def __init__(self, max_bytes=1024*1024):
+        self.cache = Cache('resource solver', max_bytes)
+
+    def apply_copy(self, cost, value, weight):
+        ''' Adds one copy of a card type with the given resource values (for the required resources only) and weight
+        to the cost grid. Returns the new cost grid, and for each residual the axis of the resource the copy was used
+        for (-1 if it was not used) and the residual of that axis before the copy was used.'''
+        best = cost.copy()
+        axis_used = numpy.full(cost.shape, -1, dtype=int)
+        previous = numpy.zeros(cost.shape, dtype=int)
+        for (axis, v) in enumerate(value):
+            if v <= 0:
+                continue
+            # Work with the resource axis in front. Residual r is reached from r + v, and residual 0 from any residual
+            # up to v.
+            moved = numpy.moveaxis(cost, axis, 0)
+            n = moved.shape[0]
+            candidate = numpy.full(moved.shape, numpy.inf)
+            source = numpy.zeros(moved.shape, dtype=int)
+            if v < n - 1:
+                candidate[1:n - v] = moved[1 + v:n] + weight
+                source[1:n - v] = numpy.arange(1 + v, n).reshape((-1,) + (1,) * (moved.ndim - 1))
+            block = moved[:min(v, n - 1) + 1]
+            candidate[0] = block.min(axis=0) + weight
+            source[0] = block.argmin(axis=0)
+            candidate = numpy.moveaxis(candidate, 0, axis)
+            source = numpy.moveaxis(source, 0, axis)
+            better = candidate < best
+            best[better] = candidate[better]
+            axis_used[better] = axis
+            previous[better] = source[better]
+        return best, axis_used, previous
+
+    def get_usable_types(self, stack, requirement, protect_collectibles):
+        ''' Returns the card types of the stack which can help to meet the requirement, as a dict {card type id: number
+        of copies}.'''
+        (values, collect) = card_types.get_table()
+        counts = collections.Counter(stack.stack)
+        usable = {}
+        for (card_id, count) in counts.items():
+            if protect_collectibles and collect[card_id] != 0:
+                continue
+            if numpy.any((values[card_id] > 0) & (requirement > 0)):
+                usable[card_id] = count
+        return usable
+
+    def solve(self, stack, requirement, objective='cards', protect_collectibles=True):
+        ''' Returns the cheapest selection of cards from stack which meets requirement (ewsmf), as an array with for
+        each card the column of the resource it is used for (0 to 4 for ewsmf) or -1 if it is not used. This is the
+        format of Game.get_selection. Returns None if the stack cannot meet the requirement. Cards are picked from the
+        back of the stack first, which is the order in which Game.fulfill_tier1 passes them.'''
+        requirement = numpy.array(requirement, dtype=int)
+        usable = self.get_usable_types(stack, requirement, protect_collectibles)
+        key = (tuple(sorted(usable.items())), tuple(requirement.tolist()), objective, protect_collectibles)
+        used = self.cache.get(key)
+        if used is None:
+            used = self.solve_types(usable, requirement, objective)
+            self.cache.put(key, used, 64 * (len(used) + 1))
+        if used == 'infeasible':
+            return None
+
+        # Hand out the used copies of each card type to the cards of that type, starting at the back of the stack.
+        selection = numpy.full(stack.get_size(), -1, dtype=int)
+        positions = collections.defaultdict(list)
+        for i in range(stack.get_size() - 1, -1, -1):
+            positions[stack.stack[i]].append(i)
+        for ((card_id, column), count) in sorted(used.items()):
+            for i in range(count):
+                selection[positions[card_id].pop(0)] = column
+        return selection
+
+    def solve_types(self, usable, requirement, objective):
+        ''' Solves the knapsack for the usable card types {card type id: copies}. Returns a dict {(card type id,
+        column): number of copies used for the resource in column}, or 'infeasible'.'''
+        (values, collect) = card_types.get_table()
+        required = numpy.flatnonzero(requirement > 0)   # Only the required resources get an axis in the grid
+        if len(required) == 0:
+            return {}
+        # Cost of reaching each residual requirement. At the start the whole requirement is left.
+        cost = numpy.full(tuple(requirement[required] + 1), numpy.inf)
+        cost[tuple(requirement[required])] = 0
+        steps = []
+        for card_id in sorted(usable):
+            value = values[card_id][required]
+            if objective == 'waste':
+                weight = values[card_id].sum() + 1e-3
+            else:
+                weight = 1 + 1e-3 * values[card_id].sum()
+            # More copies than needed to cover each required resource on its own can never help
+            needed = sum(-(-requirement[required][axis] // v) for (axis, v) in enumerate(value) if v > 0)
+            for copy in range(min(usable[card_id], needed)):
+                (cost, axis_used, previous) = self.apply_copy(cost, value, weight)
+                if not numpy.any(axis_used >= 0):   # One more copy does not improve anything
+                    break
+                steps.append((card_id, axis_used, previous))
+
+        residual = [0] * len(required)
+        if cost[tuple(residual)] == numpy.inf:
+            return 'infeasible'
+        # Walk back through the steps to find which copies were used
+        used = {}
+        for (card_id, axis_used, previous) in reversed(steps):
+            axis = axis_used[tuple(residual)]
+            if axis >= 0:
+                residual[axis] = previous[tuple(residual)]
+                column = int(required[axis])
+                used[(card_id, column)] = used.get((card_id, column), 0) + 1
+        return used
@@ -0,0 +1,50 @@
+import numpy
+
+
+class TerrainTypes:
+    '''Table of the terrain types of the board. The tiles of a board are stored as a uint8 array with the code of the
+    terrain type of each hex. Codes are looked up by name with get_code and turned back into names with get_name or
+    the names array.
+
+    Besides the real terrains the table holds the empty tile of a fresh board and the placeholders 'land' and 'random'
+    of board files, which load_map replaces. Unknown names are added when they are first seen. For each code the table
+    keeps whether it counts as land and as water, so the terrain masks of a board are lookups in these arrays.'''
+    resource_terrains = ['sand', 'forest', 'meadow', 'rock', 'swamp']  # Terrains with a resource draw pile
+    max_types = 256                                                     # Number of codes which fit in a uint8
+
+    def __init__(self):
+        self.codes = {}                                 # Name -> code
+        self.names = numpy.zeros(0, dtype=object)       # Code -> name
+        self.is_land = numpy.zeros(self.max_types, dtype=bool)
+        self.is_water = numpy.zeros(self.max_types, dtype=bool)
+        for name in ['', 'water', 'home'] + self.resource_terrains + ['land', 'random']:
+            self.get_code(name)
+        self.empty = self.codes['']
+        self.water = self.codes['water']
+        self.home = self.codes['home']
+
+    def get_code(self, name):
+        ''' Returns the code of terrain type name, adding it to the table if it is new. Everything which is not water,
+        a home town or an empty tile counts as land.'''
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.codes)
+            if code >= self.max_types:
+                raise ValueError('Too many terrain types, cannot add ' + name)
+            self.codes[name] = code
+            self.names = numpy.append(self.names, numpy.array([name], dtype=object))
+            self.is_land[code] = name not in ['water', 'home', '']
+            self.is_water[code] = name == 'water'
+        return code
+
+    def get_codes(self, names):
+        ''' Returns a uint8 array with the codes of a list of terrain names.'''
+        (unique, inverse) = numpy.unique(numpy.asarray(names, dtype=str), return_inverse=True)
+        return numpy.array([self.get_code(str(name)) for name in unique], dtype=numpy.uint8)[inverse.ravel()]
+
+    def get_name(self, code):
+        ''' Returns the name of the terrain type with code.'''
+        return self.names[code]
+
+
+terrain_types = TerrainTypes()  # The one table shared by all boards
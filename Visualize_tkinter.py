@@ -3,25 +3,34 @@ import configparser
 
 import numpy
 
+from Assets import AssetBundle
 from Grid import Grid
 from Game import Game
+from Pawn import Kind
+import Log
+from Terrain import terrain_types
+
+log = Log.get_logger('visualiser')
 
 class MainTK:
     def __init__(self,config_file):
 
         ''' Load game config file '''
-        self.log('Retrieving config from  ' + config_file)
         config = configparser.ConfigParser()
         config.read(config_file)
+        Log.configure(config)
+        log.info('Retrieving config from  %s', config_file)
 
         self.hex_size = config.getint('Visualiser','hex_size') #Horizontal hex size in pixels
 
+        ''' Load the compiled cards, board and neighbour table, or compile them if the sources changed '''
+        self.assets = AssetBundle(config)
+
         '''Inititalize the functional part of the board grid '''
-        self.grid =  Grid(config.getint('Grid','hexes_x'), config.getint('Grid','hexes_y'), self)
+        self.grid =  Grid(config.getint('Grid','hexes_x'), config.getint('Grid','hexes_y'), self, self.assets.neighbours)
 
         ''' Convert the coordinates of the hex centers to coordinates in pixels'''
-        self.x_pix = (self.grid.x_coords+1)*self.hex_size/2
-        self.y_pix = (self.grid.y_coords*0.75+1)*self.hex_size/2 # Hex centers in y dir are actually 0.75 apart
+        (self.x_pix, self.y_pix) = self.grid.get_pixel_centres(self.hex_size) # Hex centers in y dir are actually 0.75 apart
 
         ''' TKinter reference to the visualisations of currently selected hexes '''
         self.sel_items = []
@@ -37,7 +46,7 @@ class MainTK:
         self.board.grid(column=0,rowspan=8) # Make the height of the board extend over all rows if the rest of the interface as initialized below
 
         #self.grid.grow_land(config.getint('Grid','n_land'),config.get('Grid', 'tile_file'))    # Create a random map
-        self.grid.load_map(config)          # Load map from file
+        self.grid.load_map(config, self.assets.board)   # Load map from the compiled board file
 
         self.tile_color = self.assign_tile_colors(config)   # Assign colors depending on the terrain type.
         self.visualise_grid(config.get('Debug','show_index'))                               # Draw the map.
@@ -99,32 +108,28 @@ class MainTK:
         else:
             self.b2.config(state='disabled')
 
+    def auto_select_resources(self, index, assignment):
+        ''' Selects the cheapest set of resources in the home town which fulfills stage one of the assignment.'''
+        selection = self.game.auto_select_resources(index, assignment)
+        if selection is None:
+            self.message('Not enough resources for stage one of the assignment.')
+            return
+        res_labels = ['earth','wood','stone','metal','fuel']
+        for (variable, column) in zip(self.res_vars, selection):
+            if column >= 0:
+                variable.set(res_labels[column])
+            else:
+                variable.set('none')
+        self.game.check_assignment(index, self.res_vars, assignment)
+
     def assign_tile_colors(self,config):
         ''' Assigns colors to each hex based on the terrain type. Replace with graphics later.'''
 
-        tile_color = ['black']*self.grid.n_hexes # Initialize with default color
-        swampcolor = config.get('Visualiser', 'swamp')
-        forestcolor = config.get('Visualiser', 'forest')
-        meadowcolor = config.get('Visualiser', 'meadow')
-        rockcolor = config.get('Visualiser','rock')
-        sandcolor = config.get('Visualiser', 'sand')
-        homecolor = config.get('Visualiser','home')
-
-        for i in range(0,self.grid.n_hexes):
-            if self.grid.tiles[i] == 'swamp':
-                tile_color[i] = swampcolor
-            if self.grid.tiles[i] == 'forest':
-                tile_color[i] = forestcolor
-            if self.grid.tiles[i] == 'meadow':
-                tile_color[i] = meadowcolor
-            if self.grid.tiles[i] == 'rock':
-                tile_color[i] = rockcolor
-            if self.grid.tiles[i] == 'sand':
-                tile_color[i] = sandcolor
-            if self.grid.tiles[i] == 'home':
-                tile_color[i] = homecolor
-            if self.grid.tiles[i] == 'water':
-                tile_color[i] = 'blue'
+        colors = numpy.full(len(terrain_types.names), 'black', dtype=object)    # Color of each terrain code, black by default
+        for name in ['swamp', 'forest', 'meadow', 'rock', 'sand', 'home']:
+            colors[terrain_types.get_code(name)] = config.get('Visualiser', name)
+        colors[terrain_types.water] = 'blue'
+        tile_color = colors[self.grid.tiles].tolist()
 
         return tile_color
 
@@ -137,10 +142,13 @@ class MainTK:
             self.popup.destroy()
             self.popup = []
 
-        ''' Find the index of the clicked hex '''
-        ''' I'll use the squared distances rather than actual distances. This safes a number of square root calculations and the ordering will not be affected.'''
-        dist = (self.x_pix - event.x)**2 + (self.y_pix - event.y)**2
-        index = numpy.argmin(dist)
+        ''' Find the index of the clicked hex by letting the grid look up the hex drawn under the pixel. '''
+        index = self.grid.get_hex_at(event.x, event.y, self.hex_size)
+        if index < 0:
+            ''' The click is outside the board, so choose the hex with the shortest distance to the center. I'll use the
+            squared distances rather than actual distances. This safes a number of square root calculations and the ordering will not be affected.'''
+            dist = (self.x_pix - event.x)**2 + (self.y_pix - event.y)**2
+            index = numpy.argmin(dist)
         ''' Check whether the clicked pixel is inside the possible location of the "dig" option box '''
         if self.x_pix[index] - 0.3 * self.hex_size < event.x < self.x_pix[index] + 0.3 * self.hex_size and self.y_pix[
             index] - 0.3 * self.hex_size < event.y < self.y_pix[index]:
@@ -175,15 +183,15 @@ class MainTK:
         obj_x2 = obj_x + self.hex_size * 0.2
         obj_y2 = obj_y + self.hex_size * 0.2
 
-        if option == 'highlight' and 'boat' in object.label:
+        if option == 'highlight' and object.kind == Kind.BOAT:
             self.objects_shape[index] = self.board.create_rectangle(obj_x1, obj_y1, obj_x2, obj_y2, fill=object.color, outline='pink', width=5)
-        elif 'boat' in object.label:
+        elif object.kind == Kind.BOAT:
             self.objects_shape[index] = self.board.create_rectangle(obj_x1, obj_y1, obj_x2, obj_y2, fill=object.color)
-        elif option == 'highlight' and 'team' in object.label:
+        elif option == 'highlight' and object.kind == Kind.PAWN:
             self.objects_shape[index] = self.board.create_oval(obj_x1, obj_y1, obj_x2, obj_y2, fill=object.color, outline='pink', width=5)
-        elif 'team' in object.label:
+        elif object.kind == Kind.PAWN:
             self.objects_shape[index] = self.board.create_oval(obj_x1, obj_y1, obj_x2, obj_y2, fill=object.color)
-        elif 'harbour' in object.label or 'home' in object.label:
+        elif object.kind in [Kind.HARBOUR, Kind.HOME]:
             ''' Draws the player's harbour at index'''
             x_pix = self.x_pix[index]
             y_pix = self.y_pix[index]
@@ -199,7 +207,7 @@ class MainTK:
                                           outline='black', fill=object.color)
 
         else:
-            self.log('Error, cannot draw ' + object.label)
+            log.warning('Error, cannot draw %s', object.label)
 
     def enemy_resources_popup(self, index):
         '''Prints an overview of the resources in the stack belonging to an object on the board.'''
@@ -225,13 +233,13 @@ class MainTK:
         keep_i = 0 # Dummy for counting the number of resources and updating the total nr of rows in the widget later.
         self.steal_resource_var = tkinter.IntVar()
         for i in range(rows,self.grid.objects[index].resources.get_size()+rows):
-            tkinter.Radiobutton(self.popup, text=self.grid.objects[index].resources.stack[i - rows].name, variable=self.steal_resource_var, value=i - rows).grid(row=rows + keep_i, column=1, stick='W')
+            tkinter.Radiobutton(self.popup, text=self.grid.objects[index].resources.get_card(i - rows).name, variable=self.steal_resource_var, value=i - rows).grid(row=rows + keep_i, column=1, stick='W')
             keep_i = i
         rows = keep_i
 
         '''  If a current player ship with moves = 0 and stealing ability is adjacent show a button. '''
         has_objects = self.grid.get_reachable_object_indices('all', index, 1)
-        boats = [x for x in has_objects if (self.game.current_player + 'boat') in self.grid.objects[x].label]  # Find current players ships one removed
+        boats = [x for x in has_objects if self.is_player_object(x, Kind.BOAT)]  # Find current players ships one removed
         pirates = [x for x in boats if self.grid.objects[x].moves == 0 and self.grid.objects[x].can_steal]     # Only keep enemy ships that have moves = 0 and can steal = True
 
         for i in pirates:
@@ -251,6 +259,10 @@ class MainTK:
 
         self.sel_items = self.sel_items + [refs]
 
+    def is_player_object(self, index, kind):
+        ''' Checks whether hex index contains an object of the given kind which belongs to the active player.'''
+        return self.grid.objects[index].kind == kind and self.grid.objects[index].owner == self.game.current_player
+
     def kill(self,message):
         ''' Displays a popup with who won the game. When this is closed, the programm is killed. '''
 
@@ -275,13 +287,9 @@ class MainTK:
         yes.grid(row=1,column=0)
         no.grid(row=1,column=1)
 
-    def log(self, message):
-        ''' Logging function. For now it just prints to the command line, but a logfile might be handy at some point.'''
-        print(message)
-
     def message(self, message):
         ''' Prints a message to the message screen on the user interface. '''
-        self.log(message)                                   # All messages are sent to the log too
+        log.info('%s', message)                                   # All messages are sent to the log too
         #self.message_field.tag_config('player', foreground = 'blue')
         self.message_field.config(state = 'normal')         # Enable editing of text
         self.message_field.insert(1.0, message + '\n')      # Add the message at the top of the box
@@ -310,9 +318,9 @@ class MainTK:
         ''' Get the indices of hexes one step removed from the active hex and find harbors, homebases and boats.'''
         has_object = self.grid.get_reachable_object_indices('all', index, 1)
 
-        dest_harbour = [x for x in has_object if (self.game.current_player + 'harbour') in self.grid.objects[x].label]
-        dest_home = [x for x in has_object if (self.game.current_player + 'home') in self.grid.objects[x].label]
-        dest_boat = [x for x in has_object if (self.game.current_player + 'boat') in self.grid.objects[x].label]
+        dest_harbour = [x for x in has_object if self.is_player_object(x, Kind.HARBOUR)]
+        dest_home = [x for x in has_object if self.is_player_object(x, Kind.HOME)]
+        dest_boat = [x for x in has_object if self.is_player_object(x, Kind.BOAT)]
 
         rows = 2
         ''' For each harbour, home base and boat 1 step removed, add a button for shifting resources.'''
@@ -349,10 +357,9 @@ class MainTK:
         vars = [] # Declare the list of variables belonging to the checkboxes
         for i in range(rows,self.grid.objects[index].resources.get_size()+rows):
             vars.append(tkinter.IntVar())   # Add a variable to the list
-            desc = self.grid.objects[index].resources.stack[i-rows].name + ' (ewsmf: ' + self.grid.objects[index].resources.stack[i-rows].earth + ' ' + \
-                   self.grid.objects[index].resources.stack[i - rows].wood + ' ' + self.grid.objects[index].resources.stack[i - rows].stone + ' ' + \
-                   self.grid.objects[index].resources.stack[i - rows].metal + ' ' + self.grid.objects[index].resources.stack[i-rows].fuel + ' ' + \
-                   self.grid.objects[index].resources.stack[i - rows].collect + ')'
+            card = self.grid.objects[index].resources.get_card(i - rows)
+            desc = card.name + ' (ewsmf: ' + str(card.earth) + ' ' + str(card.wood) + ' ' + str(card.stone) + ' ' + \
+                   str(card.metal) + ' ' + str(card.fuel) + ' ' + card.collect + ')'
 
             checks.append([tkinter.Checkbutton(t, text = desc,variable = vars[i-rows]).grid(row = i, column=0,sticky='w')])
             keep_i = i
@@ -361,7 +368,7 @@ class MainTK:
 
 
         ''' For boats belonging to the active player we add a radiobutton with the fuel resources. Changing the dial will change the moveable hexes.'''
-        if 'boat' in self.grid.objects[index].label and self.game.current_player in self.grid.objects[index].label and self.grid.objects[index].occupying_pawn:
+        if self.is_player_object(index, Kind.BOAT) and self.grid.objects[index].occupying_pawn:
             tkinter.Label(self.popup, text='Move options').grid(row=1, column= 1, sticky='W')
             t = tkinter.Text(self.popup, width=30)
             t.config(wrap=tkinter.WORD)
@@ -374,12 +381,12 @@ class MainTK:
             rows = 2  # Count the number of rows in the popup window
             keep_i = 0
             for i in range(rows, self.grid.objects[index].resources.get_size() + rows):
-                if int(self.grid.objects[index].resources.stack[i - rows].fuel) > 0:
-                    tkinter.Radiobutton(t, text=self.grid.objects[index].resources.stack[i - rows].name, variable=self.burn_resource_var, value = i - rows, command = lambda: self.game.boat_select_fuel(index, self.burn_resource_var.get())).grid(row=rows+keep_i, column=1, stick='W')
+                if self.grid.objects[index].resources.get_card(i - rows).fuel > 0:
+                    tkinter.Radiobutton(t, text=self.grid.objects[index].resources.get_card(i - rows).name, variable=self.burn_resource_var, value = i - rows, command = lambda: self.game.boat_select_fuel(index, self.burn_resource_var.get())).grid(row=rows+keep_i, column=1, stick='W')
                     keep_i = keep_i+1  # Count the number of rows in the popup window
 
         ''' For home bases belonging to the active player we add an overview of the assignment.'''
-        if 'home' in self.grid.objects[index].label and self.game.current_player in self.grid.objects[index].label:
+        if self.is_player_object(index, Kind.HOME):
             # Retrieve the active player assignment
             assignment = self.game.get_current_player().assignment               # Also used for call by checkbuttons!
             self.show_assignment(index, self.popup, assignment, vars)
@@ -409,11 +416,11 @@ class MainTK:
         t.insert('end', assignment.name + ': ')
         t.insert('end', assignment.description + '\n')
         t.insert('end', 'Stage one description: ' + assignment.tier1_desc + ' After you finish stage one you can gain points from stage 2.' + '\n')
-        if assignment.tier1_fulfilled == '0':
+        if assignment.tier1_fulfilled == 0:
             t.insert('end', 'Required resources for stage one: ' "\n")
             for resource in iter(['tier1_req_metal', 'tier1_req_fuel', 'tier1_req_earth','tier1_req_stone', 'tier1_req_wood']):
-                if getattr(assignment,str(resource)) != '0':
-                    t.insert('end', resource[10:] + ': ' + getattr(assignment,resource) + '\n') # Print the required amount of the resource
+                if getattr(assignment,str(resource)) != 0:
+                    t.insert('end', resource[10:] + ': ' + str(getattr(assignment,resource)) + '\n') # Print the required amount of the resource
             t.insert('end',' Select resources and press fulfill \n')
         else:
             t.insert('end', 'Stage 1 fulfilled: ' "\n")
@@ -423,14 +430,14 @@ class MainTK:
 
         ''' Assignment stage 2 '''
         t.insert('end', '\n Stage two description: ' + assignment.tier2_desc + "\n")
-        if assignment.tier1_fulfilled == '0':
+        if assignment.tier1_fulfilled == 0:
             t.insert('end', 'First complete stage 1')
 
         self.b2 = tkinter.Button(t, text='Fulfill',state='disabled', command=lambda: self.game.fulfill_tier2(index, self.res_vars, assignment, target_canvas))
         t.window_create('end', window=self.b2)
         t.insert('end', "\n" 'Collected:' "\n") # Show the specials which are already added to the assignment
         for i in range(0,assignment.tier2_stack.get_size()):
-            t.insert('end', assignment.tier2_stack.stack[i].name + '\n')
+            t.insert('end', assignment.tier2_stack.get_card(i).name + '\n')
 
         #return b1, b2 # The handle to the button can be used to activate/deactive it based on the selected resources.
 
@@ -451,16 +458,23 @@ class MainTK:
             self.res_vars[i].set('none')                # Set the default value to don't use resource.
 
             ''' Create the button for not using the resource. This is the default value.'''
-            tkinter.Radiobutton(t, text="Don't use " + self.grid.objects[index].resources.stack[i].name, indicatoron = 0, variable = self.res_vars[i], command=lambda i=i: self.game.check_assignment(index, self.res_vars,assignment), value = 'none' ).grid(row=i, column=0, stick = 'W')# 0: only use basic moves, don't use fuel
+            tkinter.Radiobutton(t, text="Don't use " + self.grid.objects[index].resources.get_card(i).name, indicatoron = 0, variable = self.res_vars[i], command=lambda i=i: self.game.check_assignment(index, self.res_vars, assignment, i), value = 'none' ).grid(row=i, column=0, stick = 'W')# 0: only use basic moves, don't use fuel
 
             ''' Loop over the five resource types and create a button if it has a value larger than 0 for this resource. '''
             for j,k in zip(res_labels,range(0,5)):
-                if int(getattr(self.grid.objects[index].resources.stack[i],j)) > 0:
-                    tkinter.Radiobutton(t, text= getattr(self.grid.objects[index].resources.stack[i], j) + ' ' + j, indicatoron = 0, variable = self.res_vars[i], command=lambda i=i: self.game.check_assignment(index, self.res_vars,assignment), value = j ).grid(row=i, column=k+1, stick = 'W')# 0: only use basic moves, don't use fuel
+                if getattr(self.grid.objects[index].resources.get_card(i),j) > 0:
+                    tkinter.Radiobutton(t, text= str(getattr(self.grid.objects[index].resources.get_card(i), j)) + ' ' + j, indicatoron = 0, variable = self.res_vars[i], command=lambda i=i: self.game.check_assignment(index, self.res_vars, assignment, i), value = j ).grid(row=i, column=k+1, stick = 'W')# 0: only use basic moves, don't use fuel
 
             ''' Add a final button for the collectible.'''
-            if getattr(self.grid.objects[index].resources.stack[i],'collect') != 'none':
-                tkinter.Radiobutton(t, text=self.grid.objects[index].resources.stack[i].collect, indicatoron=0, variable=self.res_vars[i],command=lambda i=i: self.game.check_assignment(index, self.res_vars, assignment), value='collect').grid(row=i, column=6,stick='W')  # 0: only use basic moves, don't use fuel
+            if getattr(self.grid.objects[index].resources.get_card(i),'collect') != 'none':
+                tkinter.Radiobutton(t, text=self.grid.objects[index].resources.get_card(i).collect, indicatoron=0, variable=self.res_vars[i],command=lambda i=i: self.game.check_assignment(index, self.res_vars, assignment, i), value='collect').grid(row=i, column=6,stick='W')  # 0: only use basic moves, don't use fuel
+
+        ''' Add a button which selects the cheapest set of resources for stage one.'''
+        if assignment.tier1_fulfilled == 0:
+            tkinter.Button(t, text='Auto-select', command=lambda: self.auto_select_resources(index, assignment)).grid(row=len(self.res_vars), column=0, stick='W')
+
+        ''' Start the running totals of the selection, nothing is selected yet.'''
+        self.game.check_assignment(index, self.res_vars, assignment)
 
 
     def steal_resource(self, source_index, destination_index, resource_index):
@@ -500,8 +514,8 @@ class MainTK:
             reachable_sea = self.grid.get_connections([index],'water_conn',1) # Get all sea hexes one removed. Boat can only steal from neighbouring hexes
             for i in reachable_sea:
                 if self.grid.objects[i]: # First see if there is an object there at all
-                    if 'boat' in self.grid.objects[i].label and self.game.current_player not in self.grid.objects[i].owner: # Identify enemy ships
-                        if getattr(self.game,self.grid.objects[i]).resources.get_size() > 0:         # Check if there's anything to steal
+                    if self.grid.objects[i].kind == Kind.BOAT and self.grid.objects[i].owner != self.game.current_player: # Identify enemy ships
+                        if self.grid.objects[i].resources.get_size() > 0:         # Check if there's anything to steal
                             x_pix = self.x_pix[i]
                             y_pix = self.y_pix[i]
                             self.sel_items.append(
@@ -0,0 +1,81 @@
+import configparser
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import Board
+from Grid import Grid
+from Pawn import Kind
+from Terrain import terrain_types
+
+
+class TestBoard(unittest.TestCase):
+    '''Reads csv boards and their binary conversions, and loads boards into a grid.'''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.repo = os.path.dirname(os.path.abspath(__file__))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_csv(self, name, delimiter, rows, trailer='\n'):
+        file_name = os.path.join(self.folder, name)
+        with open(file_name, 'w', newline='') as f:
+            f.write(delimiter.join(['index', 'tile', 'object', 'owner']) + '\n')
+            for row in rows:
+                f.write(delimiter.join(row) + '\n')
+            f.write(trailer)
+        return file_name
+
+    def assert_same(self, board, other):
+        self.assertEqual(board.n_hexes, other.n_hexes)
+        numpy.testing.assert_array_equal(board.get_tiles(), other.get_tiles())
+        numpy.testing.assert_array_equal(board.kinds, other.kinds)
+        numpy.testing.assert_array_equal(board.owners, other.owners)
+
+    def round_trip(self, csv_file):
+        board_file = csv_file + '.hexboard'
+        Board.convert(csv_file, board_file, chunk_rows=3)
+        board = Board.read_csv(csv_file)
+        self.assert_same(Board.read(board_file), board)
+        return board
+
+    def test_round_trip(self):
+        rows = [['0', 'water', '', ''], ['1', 'sand', 'pawn', 'player1'], ['2', 'forest', '', ''],
+                ['3', 'home', 'home', 'player2'], ['4', 'water', 'boat', 'player1'], ['5', 'meadow', '', ''],
+                ['6', 'random', '', ''], ['7', 'water', 'harbour', 'player2']]
+        for delimiter in [',', ';']:
+            board = self.round_trip(self.write_csv('board' + delimiter + '.csv', delimiter, rows, trailer='\n\n'))
+            self.assertEqual(board.n_hexes, len(rows))
+            self.assertEqual(list(terrain_types.names[board.get_tiles()]), [row[1] for row in rows])
+            self.assertEqual(board.kinds[1], Kind.PAWN.value)
+            self.assertEqual(board.owners[3], 2)
+
+    def test_round_trip_boards(self):
+        for name in ['board.csv', 'board_playtest_1.csv', 'board_dev_small.csv']:
+            self.round_trip(shutil.copy(os.path.join(self.repo, name), self.folder))
+
+    def test_malformed_row(self):
+        csv_file = self.write_csv('broken.csv', ';', [['0', 'water', '', ''], ['1']])
+        self.assertRaises(ValueError, Board.read_csv, csv_file)
+
+    def test_load_map_keeps_board(self):
+        # Loading the same board twice randomizes both grids, the board itself keeps its random tiles
+        config = configparser.ConfigParser()
+        config.read(os.path.join(self.repo, 'Config.ini'))
+        config.set('Grid', 'tile_file', os.path.join(self.repo, config.get('Grid', 'tile_file')))
+        board = Board.read_csv(os.path.join(self.repo, config.get('Game', 'board')))
+        random_tiles = numpy.copy(board.tiles)
+        for attempt in range(2):
+            grid = Grid(config.getint('Grid', 'hexes_x'), config.getint('Grid', 'hexes_y'), None)
+            grid.load_map(config, board)
+            numpy.testing.assert_array_equal(board.tiles, random_tiles)
+            self.assertFalse(numpy.any(grid.tiles == terrain_types.get_code('random')))
+            self.assertFalse(numpy.any(grid.tiles == terrain_types.get_code('land')))
+
+
+if __name__ == '__main__':
+    unittest.main()
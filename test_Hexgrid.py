@@ -0,0 +1,57 @@
+import unittest
+
+import numpy
+
+from Hexgrid import Hexgrid
+
+
+class TestGetHexAt(unittest.TestCase):
+    '''Clicks on the pixels of hexes drawn like Visualize_tkinter.draw_hex and checks that get_hex_at finds the hex drawn
+    under them.'''
+    hex_size = 40
+    # Pixel offsets from the centre of a hex to the middle of its edges, in the order of Hexgrid.axial_directions
+    edges = [(0.5, 0), (0.25, -0.375), (-0.25, -0.375), (-0.5, 0), (-0.25, 0.375), (0.25, 0.375)]
+    corners = [(0.5, -0.25), (0, -0.5), (-0.5, -0.25), (-0.5, 0.25), (0, 0.5), (0.5, 0.25)]
+
+    def setUp(self):
+        self.grid = Hexgrid(12, 28, 0)
+        (self.x_pix, self.y_pix) = self.grid.get_pixel_centres(self.hex_size)
+
+    def click(self, index, d_x, d_y):
+        ''' Returns the hex found for the pixel at offset d_x, d_y (in hex sizes) from the centre of hex index.'''
+        return self.grid.get_hex_at(self.x_pix[index] + d_x * self.hex_size, self.y_pix[index] + d_y * self.hex_size,
+                                    self.hex_size)
+
+    def test_centres(self):
+        for index in range(self.grid.n_hexes):
+            self.assertEqual(self.click(index, 0, 0), index)
+
+    def test_inside_edges_and_corners(self):
+        for index in range(self.grid.n_hexes):
+            for (d_x, d_y) in self.edges + self.corners:
+                self.assertEqual(self.click(index, 0.95 * d_x, 0.95 * d_y), index)
+
+    def test_across_edges(self):
+        # Just across an edge lies the neighbour in that direction, or nothing at the sides of the board
+        for index in range(self.grid.n_hexes):
+            for (direction, (d_x, d_y)) in enumerate(self.edges):
+                self.assertEqual(self.click(index, 1.05 * d_x, 1.05 * d_y), self.grid.get_neighbour(index, direction))
+
+    def test_random_pixels(self):
+        # Compare with a point in polygon test on the drawn hexes, skipping the few pixels right on an edge
+        rng = numpy.random.RandomState(0)
+        for (x, y) in zip(rng.uniform(0, 12.5 * self.hex_size, 2000), rng.uniform(0, 21.25 * self.hex_size, 2000)):
+            d_x = numpy.abs(x - self.x_pix) / self.hex_size
+            d_y = numpy.abs(y - self.y_pix) / self.hex_size
+            margin = 0.5 - d_y - 0.5 * d_x
+            inside = numpy.flatnonzero((d_x < 0.5) & (margin > 0))
+            if len(inside) == 1 and margin[inside[0]] > 1e-6 and 0.5 - d_x[inside[0]] > 1e-6:
+                self.assertEqual(self.grid.get_hex_at(x, y, self.hex_size), inside[0])
+
+    def test_outside(self):
+        self.assertEqual(self.grid.get_hex_at(-5, -5, self.hex_size), -1)
+        self.assertEqual(self.grid.get_hex_at(13 * self.hex_size, 5, self.hex_size), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import itertools
+import os
+import unittest
+
+import numpy
+
+from Cards import card_types, Stack
+from Solver import ResourceSolver
+
+
+class TestResourceSolver(unittest.TestCase):
+    '''Compares ResourceSolver.solve with a brute force search over all selections of small stacks.'''
+    def setUp(self):
+        folder = os.path.dirname(os.path.abspath(__file__))
+        self.resources = [card for (card, copies) in card_types.load(os.path.join(folder, 'Resources.ini'))]
+        self.specials = [card for (card, copies) in card_types.load(os.path.join(folder, 'Specials.ini'))]
+        (self.values, self.collect) = card_types.get_table()
+        self.solver = ResourceSolver()
+        self.rng = numpy.random.RandomState(0)
+
+    def make_stack(self, cards):
+        stack = Stack('test')
+        stack.create_cards([(card, 1) for card in cards])
+        return stack
+
+    def get_cost(self, stack, selection, objective):
+        ''' Returns the cost of a selection in the order of the objective: (cards, value) or (value, cards).'''
+        used = [stack.stack[i] for i in range(len(selection)) if selection[i] >= 0]
+        n_cards = len(used)
+        value = int(self.values[used].sum()) if used else 0
+        return (n_cards, value) if objective == 'cards' else (value, n_cards)
+
+    def meets(self, stack, selection, requirement):
+        total = numpy.zeros(len(requirement), dtype=int)
+        for (i, column) in enumerate(selection):
+            if column >= 0:
+                total[column] += self.values[stack.stack[i], column]
+        return bool(numpy.all(total >= requirement))
+
+    def brute_force(self, stack, requirement, objective, protect_collectibles):
+        ''' Returns the lowest cost of all selections which meet requirement, or None if there are none.'''
+        required = [column for column in range(len(requirement)) if requirement[column] > 0]
+        options = []
+        for card_id in stack.stack:
+            if protect_collectibles and self.collect[card_id] != 0:
+                options.append([-1])
+            else:
+                options.append([-1] + [column for column in required if self.values[card_id, column] > 0])
+        costs = [self.get_cost(stack, selection, objective) for selection in itertools.product(*options)
+                 if self.meets(stack, selection, requirement)]
+        return min(costs) if costs else None
+
+    def check(self, cards, requirement, objective, protect_collectibles=True):
+        stack = self.make_stack(cards)
+        requirement = numpy.array(requirement)
+        selection = self.solver.solve(stack, requirement, objective, protect_collectibles)
+        best = self.brute_force(stack, requirement, objective, protect_collectibles)
+        if best is None:
+            self.assertIsNone(selection)
+            return
+        self.assertIsNotNone(selection)
+        self.assertTrue(self.meets(stack, selection, requirement))
+        self.assertEqual(self.get_cost(stack, selection, objective), best)
+        if protect_collectibles:
+            for (i, column) in enumerate(selection):
+                self.assertTrue(column < 0 or self.collect[stack.stack[i]] == 0)
+
+    def random_requirement(self):
+        requirement = numpy.zeros(len(card_types.resources), dtype=int)
+        columns = self.rng.choice(len(requirement), self.rng.randint(1, 4), replace=False)
+        requirement[columns] = self.rng.randint(1, 6, len(columns))
+        return requirement
+
+    def test_random_stacks(self):
+        for objective in ['cards', 'waste']:
+            for case in range(40):
+                cards = [self.resources[i] for i in self.rng.randint(0, len(self.resources), 6)]
+                self.check(cards, self.random_requirement(), objective)
+
+    def test_infeasible(self):
+        cards = self.resources[:3]
+        requirement = self.values[[card.id for card in cards]].sum(axis=0) + 1
+        for objective in ['cards', 'waste']:
+            self.assertIsNone(self.solver.solve(self.make_stack(cards), requirement, objective))
+            self.check(cards, requirement, objective)
+
+    def test_collectibles(self):
+        for objective in ['cards', 'waste']:
+            for case in range(20):
+                cards = ([self.resources[i] for i in self.rng.randint(0, len(self.resources), 3)] +
+                         [self.specials[i] for i in self.rng.randint(0, len(self.specials), 3)])
+                requirement = self.random_requirement()
+                self.check(cards, requirement, objective, protect_collectibles=True)
+                self.check(cards, requirement, objective, protect_collectibles=False)
+
+
+if __name__ == '__main__':
+    unittest.main()